@@ -2,17 +2,53 @@
 from passlib.context import CryptContext
 from datetime import datetime, timedelta
 from fastapi import Depends, HTTPException
-from sqlalchemy.orm import Session
-from models import BlacklistedToken
-from database import get_db
+from fastapi.security import OAuth2PasswordBearer
+from sqlalchemy import delete, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from database import get_async_db, get_async_read_db, primary_of
+from models import RefreshToken, User, VIPTable
+from revocation import revocation_cache, revocation_digest, token_digest, token_versions
 from jose import JWTError, jwt  # Use python-jose
+from pools import BoundedPool
+from ratelimit import LoginLimiter
+from jwt_cache import claims_cache
+from timing import timed
+import os
+import secrets
+import uuid
+from typing import NamedTuple, Optional
 
-# Initialize passlib context with bcrypt
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# New hashes use the first scheme; the others are still accepted and upgraded at login.
+# argon2 needs the argon2 extra (argon2-cffi). Use calibrate_password_hash.py to pick the costs.
+PASSWORD_SCHEMES = [s.strip() for s in os.getenv("PASSWORD_SCHEMES", "bcrypt").split(",") if s.strip()]
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+ARGON2_TIME_COST = int(os.getenv("ARGON2_TIME_COST", "3"))
+ARGON2_MEMORY_COST = int(os.getenv("ARGON2_MEMORY_COST", "65536"))  # KiB
+ARGON2_PARALLELISM = int(os.getenv("ARGON2_PARALLELISM", "1"))
+
+def make_password_context(schemes=PASSWORD_SCHEMES, bcrypt_rounds=BCRYPT_ROUNDS, argon2_time_cost=ARGON2_TIME_COST,
+                          argon2_memory_cost=ARGON2_MEMORY_COST, argon2_parallelism=ARGON2_PARALLELISM) -> CryptContext:
+    # min == max cost, so hashes made at any other cost (cheaper or dearer) count as needing an update
+    return CryptContext(
+        schemes=schemes,
+        deprecated="auto",
+        bcrypt__default_rounds=bcrypt_rounds,
+        bcrypt__min_rounds=bcrypt_rounds,
+        bcrypt__max_rounds=bcrypt_rounds,
+        argon2__type="ID",
+        argon2__time_cost=argon2_time_cost,
+        argon2__memory_cost=argon2_memory_cost,
+        argon2__parallelism=argon2_parallelism,
+    )
+
+pwd_context = make_password_context()
+
+oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/login")
 
 SECRET_KEY = "your-secret-key-here"  # Replace with a strong, unique key
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
+REFRESH_TOKEN_EXPIRE_DAYS = int(os.getenv("REFRESH_TOKEN_EXPIRE_DAYS", "14"))
 
 def hash_password(password: str) -> str:
     return pwd_context.hash(password)
@@ -20,32 +56,165 @@ def hash_password(password: str) -> str:
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
+def verify_and_update_password(plain_password: str, hashed_password: str) -> tuple:
+    # (matches, new_hash): new_hash is set when the stored hash uses an old scheme or cost
+    return pwd_context.verify_and_update(plain_password, hashed_password)
+
+# Password hashing is ~250 ms of CPU per call, so the endpoints run it on this pool
+hash_pool = BoundedPool(
+    "bcrypt",
+    kind=os.getenv("HASH_POOL_KIND", "thread"),
+    workers=int(os.getenv("HASH_POOL_WORKERS", "0")) or None,
+    max_queue=int(os.getenv("HASH_POOL_MAX_QUEUE", "256")),
+)
+
+# Password checks allowed in flight at once; more are shed with 429 rather than queued
+login_limiter = LoginLimiter(max_concurrent=int(os.getenv("LOGIN_MAX_CONCURRENT", "0")) or hash_pool.workers * 4)
+
+async def hash_password_async(password: str) -> str:
+    with timed("auth"):
+        return await hash_pool.run(hash_password, password)
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    with timed("auth"):
+        return await hash_pool.run(verify_password, plain_password, hashed_password)
+
+async def verify_and_update_password_async(plain_password: str, hashed_password: str) -> tuple:
+    with timed("auth"):
+        return await hash_pool.run(verify_and_update_password, plain_password, hashed_password)
+
 def create_access_token(data: dict, expires_delta: timedelta = None):
     to_encode = data.copy()
     if expires_delta:
         expire = datetime.utcnow() + expires_delta
     else:
         expire = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-    to_encode.update({"exp": expire})
+    # jti identifies the token in the blacklist without storing the token itself
+    to_encode.update({"exp": expire, "jti": uuid.uuid4().hex})
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-def verify_token(token: str, db: Session = Depends(get_db)) -> str:
+def issue_refresh_token(db: AsyncSession, user_id: int, family: str = None) -> str:
+    # Opaque random token; only its digest is stored, so a DB leak can't be replayed
+    token = secrets.token_urlsafe(32)
+    db.add(RefreshToken(
+        digest=token_digest(token),
+        user_id=user_id,
+        family=family or uuid.uuid4().hex,
+        expires_at=datetime.utcnow() + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS),
+    ))
+    return token
+
+def token_response(access_token: str, refresh_token: str) -> dict:
+    return {
+        "access_token": access_token,
+        "token_type": "bearer",
+        "expires_in": ACCESS_TOKEN_EXPIRE_MINUTES * 60,
+        "refresh_token": refresh_token,
+    }
+
+async def rotate_refresh_token(db: AsyncSession, token: str) -> dict:
+    """Trade a refresh token for a new access/refresh pair: one indexed lookup, no bcrypt."""
+    now = datetime.utcnow()
+    row = (await db.execute(
+        select(RefreshToken, User.username, User.token_version)
+        .join(User, User.id == RefreshToken.user_id)
+        .where(RefreshToken.digest == token_digest(token))
+    )).first()
+    if not row or row.RefreshToken.expires_at < now:
+        raise HTTPException(status_code=401, detail="Invalid or expired refresh token")
+    refresh, username, token_version = row
+
+    # Claim it; of two concurrent uses only one can match used_at IS NULL
+    claimed = await db.execute(
+        update(RefreshToken).where(RefreshToken.id == refresh.id, RefreshToken.used_at.is_(None)).values(used_at=now)
+    )
+    if claimed.rowcount != 1:
+        # A rotated token came back: it was copied, so end every session of that login
+        await revoke_refresh_family(db, refresh.family)
+        raise HTTPException(status_code=401, detail="Refresh token reused, please log in again")
+    new_token = issue_refresh_token(db, refresh.user_id, refresh.family)
+    await db.commit()
+    access_token = create_access_token(data={"sub": username, "uid": refresh.user_id, "ver": token_version})
+    return token_response(access_token, new_token)
+
+async def revoke_refresh_family(db: AsyncSession, family: str):
+    await db.execute(delete(RefreshToken).where(RefreshToken.family == family))
+    await db.commit()
+
+async def revoke_refresh_token(db: AsyncSession, token: str):
+    family = await db.scalar(select(RefreshToken.family).where(RefreshToken.digest == token_digest(token)))
+    if family:
+        await revoke_refresh_family(db, family)
+
+async def revoke_all_sessions(db: AsyncSession, user_id: int):
+    # One counter bump invalidates every access token; refresh tokens go with it
+    await db.execute(update(User).where(User.id == user_id).values(token_version=User.token_version + 1))
+    await db.execute(delete(RefreshToken).where(RefreshToken.user_id == user_id))
+    await db.commit()
+    token_versions.invalidate(user_id)
+
+async def verify_token(token: str, db: AsyncSession = Depends(get_async_db)) -> str:
+    payload = await verify_token_payload(token, db)
+    return payload["sub"]
+
+async def verify_token_payload(token: str, db: AsyncSession = Depends(get_async_db)) -> dict:
     try:
-        # Check if token is blacklisted
-        if db.query(BlacklistedToken).filter(BlacklistedToken.token == token).first():
+        # Decode token; a session's repeat requests reuse the claims verified the first time
+        with timed("auth"):
+            payload = claims_cache.get(token)
+            if payload is None:
+                payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+                claims_cache.put(token, payload)
+
+        # Revocation state comes from the primary even on read-only routes: a lagging
+        # replica would miss a fresh blacklist row or hand back a pre-logout version.
+        # The blacklist itself is checked against the in-memory copy of the table.
+        authority = primary_of(db) or db
+        if revocation_cache.is_stale():
+            await revocation_cache.refresh(authority)
+        if revocation_cache.is_revoked(revocation_digest(token, payload)):
             raise HTTPException(status_code=401, detail="Token is blacklisted")
+        # "Log out all devices" bumps users.token_version; older tokens stop matching.
+        # Unknown users fall through to the usual 404 from the member lookup.
+        if "uid" in payload:
+            version = await token_versions.get(authority, payload["uid"])
+            if version is not None and payload.get("ver", 0) != version:
+                raise HTTPException(status_code=401, detail="Token has been revoked")
 
-        # Decode token
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         username: str = payload.get("sub")
         if username is None:
             raise HTTPException(status_code=401, detail="Invalid token")
-        return username
+        return payload
     except JWTError:  # Use JWTError from python-jose
         raise HTTPException(status_code=401, detail="Invalid or expired token")
 
 
+class CurrentMember(NamedTuple):
+    user: User
+    vip: Optional[VIPTable]
+
+async def get_current_member(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_async_read_db)) -> CurrentMember:
+    # Revocation is checked in memory, so the user and VIP row cost a single joined query
+    payload = await verify_token_payload(token, db)
+    return await load_member(db, payload)
+
+async def load_member(db: AsyncSession, payload: dict, *options) -> CurrentMember:
+    # Loader options (load_only, undefer_group) pick which VIP columns are fetched
+    query = select(User, VIPTable).outerjoin(VIPTable, VIPTable.IDvip == User.id).options(*options)
+    if "uid" in payload:
+        query = query.where(User.id == payload["uid"])
+    else:
+        query = query.where(User.username == payload["sub"])  # Tokens issued before uid existed
+    row = (await db.execute(query)).first()
+    if not row and primary_of(db) is not None:
+        # Replica may not have caught up with a fresh signup yet
+        row = (await primary_of(db).execute(query)).first()
+    if not row:
+        raise HTTPException(status_code=404, detail="User not found")
+    return CurrentMember(*row)
+
+
 # from passlib.context import CryptContext
 # from jose import JWTError, jwt
 # from datetime import datetime, timedelta
@@ -0,0 +1,246 @@
+# barcodes.py
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from io import BytesIO
+
+import barcode  # This should work if python-barcode is installed
+from barcode.writer import ImageWriter
+from pools import BoundedPool
+from timing import timed
+
+# Bump when rendering output changes so cached images and ETags are invalidated
+RENDER_VERSION = "1"
+
+BARCODE_CACHE_MAX_BYTES = int(os.getenv("BARCODE_CACHE_MAX_BYTES", str(16 * 1024 * 1024)))
+BARCODE_CACHE_DIR = os.getenv("BARCODE_CACHE_DIR") or None
+
+# Default options passed to the barcode writer
+WRITER_OPTIONS = {"format": "PNG"}
+
+MEDIA_TYPES = {"PNG": "image/png", "SVG": "image/svg+xml"}
+
+# Formats cheap enough to render directly on the event loop
+INLINE_FORMATS = {"SVG"}
+
+# Code128 symbol widths (bar, space, bar, space, bar, space) for values 0-105
+CODE128_WIDTHS = (
+    "212222 222122 222221 121223 121322 131222 122213 122312 132212 221213 "
+    "221312 231212 112232 122132 122231 113222 123122 123221 223211 221132 "
+    "221231 213212 223112 312131 311222 321122 321221 312212 322112 322211 "
+    "212123 212321 232121 111323 131123 131321 112313 132113 132311 211313 "
+    "231113 231311 112133 112331 132131 113123 113321 133121 313121 211331 "
+    "231131 213113 213311 213131 311123 311321 331121 312113 312311 332111 "
+    "314111 221411 431111 111224 111422 121124 121421 141122 141221 112214 "
+    "112412 122114 122411 142112 142211 241211 221114 413111 241112 134111 "
+    "111242 121142 121241 114212 124112 124211 411212 421112 421211 212141 "
+    "214121 412121 111143 111341 131141 114113 114311 411113 411311 113141 "
+    "114131 311141 411131 211412 211214 211232"
+).split()
+CODE128_STOP = "2331112"
+CODE_B, CODE_C, START_B, START_C = 100, 99, 104, 105
+
+# Quiet zone and bar height in modules for the SVG output
+SVG_QUIET_ZONE = 10
+SVG_BAR_HEIGHT = 50
+SVG_TEXT_HEIGHT = 12
+
+
+def barcode_key(code: str, options: dict) -> str:
+    # Rendered output depends only on the code, the writer options and the renderer version
+    raw = "|".join([RENDER_VERSION, code] + [f"{k}={options[k]}" for k in sorted(options)])
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+def barcode_etag(code: str, options: dict) -> str:
+    return f'"{barcode_key(code, options)[:32]}"'
+
+def can_encode_code128(code: str) -> bool:
+    # Code sets B and C only cover ASCII 32-127; anything else has no symbol
+    return bool(code) and all(32 <= ord(c) <= 127 for c in code)
+
+def encode_code128(code: str) -> list:
+    """Encode text as Code128 symbol values, start code and checksum included.
+
+    Uses code set B for text and switches to code set C for runs of four or
+    more digits, which packs two digits into each symbol.
+    """
+    if not can_encode_code128(code):
+        raise ValueError(f"Cannot encode {code!r} as Code128")
+
+    values = []
+    current = None
+    i = 0
+    while i < len(code):
+        run = 0
+        while i + run < len(code) and code[i + run].isdigit():
+            run += 1
+        if run >= 4 or (run >= 2 and run == len(code)):
+            # Odd runs put their first digit in code set B
+            if run % 2:
+                if current != "B":
+                    values.append(START_B if current is None else CODE_B)
+                    current = "B"
+                values.append(ord(code[i]) - 32)
+                i += 1
+                run -= 1
+            if current != "C":
+                values.append(START_C if current is None else CODE_C)
+                current = "C"
+            for j in range(i, i + run, 2):
+                values.append(int(code[j:j + 2]))
+            i += run
+        else:
+            if current != "B":
+                values.append(START_B if current is None else CODE_B)
+                current = "B"
+            values.append(ord(code[i]) - 32)
+            i += 1
+
+    checksum = values[0] + sum(pos * value for pos, value in enumerate(values[1:], start=1))
+    values.append(checksum % 103)
+    return values
+
+def code128_bars(code: str) -> list:
+    """Return (x, width) pairs of the dark bars in module units, quiet zone excluded."""
+    widths = "".join(CODE128_WIDTHS[value] for value in encode_code128(code)) + CODE128_STOP
+    bars = []
+    x = 0
+    for index, width in enumerate(widths):
+        width = int(width)
+        if index % 2 == 0:
+            bars.append((x, width))
+        x += width
+    return bars
+
+def render_svg(code: str) -> bytes:
+    # One path with a rectangle per bar, sized in module units
+    bars = code128_bars(code)
+    last_x, last_width = bars[-1]
+    width = last_x + last_width + 2 * SVG_QUIET_ZONE
+    height = SVG_BAR_HEIGHT + SVG_TEXT_HEIGHT
+    path = "".join(f"M{x + SVG_QUIET_ZONE} 0h{w}v{SVG_BAR_HEIGHT}h-{w}z" for x, w in bars)
+    text = code.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
+    return (
+        f'<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 {width} {height}">'
+        f'<rect width="{width}" height="{height}" fill="#fff"/>'
+        f'<path d="{path}"/>'
+        f'<text x="{width / 2:g}" y="{height - 1}" font-family="monospace" font-size="10" text-anchor="middle">{text}</text>'
+        f'</svg>'
+    ).encode()
+
+def render_barcode(code: str, options: dict) -> bytes:
+    if options.get("format") == "SVG":
+        return render_svg(code)
+    # Generate Code128 barcode into an in-memory buffer
+    code128 = barcode.get_barcode_class('code128')
+    barcode_instance = code128(code, writer=ImageWriter(format=options.get("format", "PNG")))
+    buffer = BytesIO()
+    barcode_instance.write(buffer, options={k: v for k, v in options.items() if k != "format"})
+    return buffer.getvalue()
+
+
+class BarcodeCache:
+    """Size-bounded LRU of rendered barcodes with an optional on-disk tier."""
+
+    def __init__(self, max_bytes: int = BARCODE_CACHE_MAX_BYTES, directory: str = BARCODE_CACHE_DIR):
+        self.max_bytes = max_bytes
+        self.directory = directory
+        self._items = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.bin")
+
+    def get(self, key: str):
+        with self._lock:
+            data = self._items.get(key)
+            if data is not None:
+                self._items.move_to_end(key)
+                self.hits += 1
+            return data
+
+    def load(self, key: str):
+        # Disk tier lookup, called from the worker pool
+        if not self.directory:
+            return None
+        try:
+            with open(self._path(key), "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            return None
+        self.disk_hits += 1
+        return data
+
+    def store(self, key: str, data: bytes):
+        if not self.directory:
+            return
+        # Write to a temp file first so readers never see a partial image
+        tmp = f"{self._path(key)}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, self._path(key))
+
+    def put(self, key: str, data: bytes):
+        if len(data) > self.max_bytes:
+            return
+        with self._lock:
+            old = self._items.pop(key, None)
+            if old is not None:
+                self._size -= len(old)
+            self._items[key] = data
+            self._size += len(data)
+            while self._size > self.max_bytes:
+                _, evicted = self._items.popitem(last=False)
+                self._size -= len(evicted)
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+            self._size = 0
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._items),
+            "bytes": self._size,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+        }
+
+
+barcode_cache = BarcodeCache()
+
+# Rendering is CPU-bound Pillow work, keep it off the event loop
+barcode_pool = BoundedPool(
+    "barcode",
+    workers=int(os.getenv("BARCODE_POOL_WORKERS", "0")) or None,
+    max_queue=int(os.getenv("BARCODE_POOL_MAX_QUEUE", "256")),
+)
+
+def _load_or_render(key: str, code: str, options: dict) -> bytes:
+    data = barcode_cache.load(key)
+    if data is None:
+        data = render_barcode(code, options)
+        barcode_cache.store(key, data)
+    return data
+
+async def get_barcode_image(code: str, options: dict = WRITER_OPTIONS) -> bytes:
+    key = barcode_key(code, options)
+    data = barcode_cache.get(key)
+    if data is None:
+        barcode_cache.misses += 1
+        with timed("render"):
+            if options.get("format") in INLINE_FORMATS:
+                data = render_barcode(code, options)
+            else:
+                data = await barcode_pool.run(_load_or_render, key, code, options)
+        barcode_cache.put(key, data)
+    return data
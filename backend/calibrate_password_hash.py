@@ -0,0 +1,79 @@
+# calibrate_password_hash.py
+# Measures password hashing on this machine and picks the highest cost whose
+# verification stays within a target time, then prints the .env settings.
+#
+#   uv run python calibrate_password_hash.py --scheme bcrypt --target-ms 250
+#   uv run python calibrate_password_hash.py --scheme argon2 --target-ms 150 --memory-kib 65536
+#
+# Run it on the production hardware (or the same instance type). Existing hashes
+# are upgraded to the new cost as members log in.
+import argparse
+import os
+import statistics
+import time
+
+from auth import make_password_context
+
+PASSWORD = "calibration-password"
+
+
+def verify_ms(context, samples: int) -> float:
+    # Median of several verifications; the first hash also warms up the backend
+    hashed = context.hash(PASSWORD)
+    timings = []
+    for _ in range(samples):
+        start = time.perf_counter()
+        context.verify(PASSWORD, hashed)
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def calibrate_bcrypt(target_ms: float, samples: int, log=print) -> tuple:
+    best = None
+    for rounds in range(4, 32):
+        ms = verify_ms(make_password_context(["bcrypt"], bcrypt_rounds=rounds), samples)
+        log(f"bcrypt rounds={rounds:<3} {ms:8.1f} ms")
+        if ms > target_ms:
+            break
+        best = ({"BCRYPT_ROUNDS": rounds}, ms)
+    return best
+
+
+def calibrate_argon2(target_ms: float, samples: int, memory_kib: int, parallelism: int, log=print) -> tuple:
+    # Memory is the main defence against GPUs, so it is fixed and time_cost scales to the target
+    best = None
+    for time_cost in range(1, 64):
+        context = make_password_context(["argon2"], argon2_time_cost=time_cost, argon2_memory_cost=memory_kib,
+                                        argon2_parallelism=parallelism)
+        ms = verify_ms(context, samples)
+        log(f"argon2id t={time_cost:<3} m={memory_kib} KiB p={parallelism}  {ms:8.1f} ms")
+        if ms > target_ms:
+            break
+        best = ({"ARGON2_TIME_COST": time_cost, "ARGON2_MEMORY_COST": memory_kib, "ARGON2_PARALLELISM": parallelism}, ms)
+    return best
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pick password hash costs that meet a target verification time")
+    parser.add_argument("--scheme", choices=("bcrypt", "argon2"), default="bcrypt")
+    parser.add_argument("--target-ms", type=float, default=250.0, help="Max median verification time per password")
+    parser.add_argument("--samples", type=int, default=5)
+    parser.add_argument("--memory-kib", type=int, default=65536, help="argon2 memory cost")
+    parser.add_argument("--parallelism", type=int, default=1, help="argon2 lanes")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Hash pool workers, for the throughput estimate")
+    args = parser.parse_args()
+
+    if args.scheme == "bcrypt":
+        result = calibrate_bcrypt(args.target_ms, args.samples)
+    else:
+        result = calibrate_argon2(args.target_ms, args.samples, args.memory_kib, args.parallelism)
+    if result is None:
+        raise SystemExit(f"Even the cheapest {args.scheme} setting is slower than {args.target_ms} ms here")
+
+    settings, ms = result
+    print(f"\n# {args.scheme}: {ms:.1f} ms per verification, about {args.workers * 1000 / ms:.0f} logins/s "
+          f"with {args.workers} hash workers")
+    # Existing members have bcrypt hashes; keep bcrypt listed so they verify and get upgraded at login
+    print(f"PASSWORD_SCHEMES={'bcrypt' if args.scheme == 'bcrypt' else 'argon2,bcrypt'}")
+    for key, value in settings.items():
+        print(f"{key}={value}")
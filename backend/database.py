@@ -1,23 +1,203 @@
-from sqlalchemy import create_engine
+from itertools import cycle
+import time
+from fastapi import Depends, Request
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import declarative_base
 from sqlalchemy.orm import sessionmaker
+from timing import record_query
 import os
 from dotenv import load_dotenv
 
 load_dotenv()
-DATABASE_URL = os.getenv("DATABASE_URL")
+# Falls back to a local SQLite file for development and test runs
+DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./membership.db")
 
-engine = create_engine(DATABASE_URL)
+# Sync driver -> async driver used by the request path
+ASYNC_DRIVERS = {
+    "mysql": "mysql+aiomysql",
+    "mysql+pymysql": "mysql+aiomysql",
+    "sqlite": "sqlite+aiosqlite",
+    "sqlite+pysqlite": "sqlite+aiosqlite",
+}
+
+def to_async_url(url: str) -> str:
+    scheme, sep, rest = url.partition("://")
+    return ASYNC_DRIVERS.get(scheme, scheme) + sep + rest
+
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL") or to_async_url(DATABASE_URL)
+
+# Connection pool settings, per worker process
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+# Recycle before MySQL's wait_timeout (default 8h) drops idle connections
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes")
+
+
+class PoolMetrics:
+    """Checkout wait and connection lifetime figures for one engine's pool."""
+
+    def __init__(self):
+        self.checkouts = 0
+        self.checkout_wait_seconds_total = 0.0
+        self.checkout_wait_seconds_max = 0.0
+        self.connections_opened = 0
+        self.connections_closed = 0
+        self.connection_lifetime_seconds_total = 0.0
+        self.connection_lifetime_seconds_max = 0.0
+        self.pool = None
+
+    def record_wait(self, seconds: float):
+        self.checkouts += 1
+        self.checkout_wait_seconds_total += seconds
+        self.checkout_wait_seconds_max = max(self.checkout_wait_seconds_max, seconds)
+
+    def attach(self, engine):
+        self.pool = engine.pool
+        event.listen(engine, "connect", self._on_connect)
+        event.listen(engine, "close", self._on_close)
+
+    def _on_connect(self, dbapi_connection, connection_record):
+        self.connections_opened += 1
+        connection_record.info["opened_at"] = time.monotonic()
+
+    def _on_close(self, dbapi_connection, connection_record):
+        opened_at = connection_record.info.pop("opened_at", None)
+        if opened_at is not None:
+            lifetime = time.monotonic() - opened_at
+            self.connections_closed += 1
+            self.connection_lifetime_seconds_total += lifetime
+            self.connection_lifetime_seconds_max = max(self.connection_lifetime_seconds_max, lifetime)
+
+    def stats(self) -> dict:
+        pool = self.pool
+        return {
+            "size": pool.size() if hasattr(pool, "size") else None,
+            "checked_out": pool.checkedout() if hasattr(pool, "checkedout") else None,
+            "overflow": pool.overflow() if hasattr(pool, "overflow") else None,
+            "checkouts": self.checkouts,
+            "checkout_wait_seconds_total": round(self.checkout_wait_seconds_total, 6),
+            "checkout_wait_seconds_max": round(self.checkout_wait_seconds_max, 6),
+            "connections_opened": self.connections_opened,
+            "connections_closed": self.connections_closed,
+            "connection_lifetime_seconds_avg": round(self.connection_lifetime_seconds_total / self.connections_closed, 3)
+            if self.connections_closed else 0.0,
+            "connection_lifetime_seconds_max": round(self.connection_lifetime_seconds_max, 3),
+        }
+
+
+class TimedQueuePool(QueuePool):
+    # Measures how long each checkout waits for a free connection
+    metrics = None
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            if self.metrics is not None:
+                self.metrics.record_wait(time.perf_counter() - start)
+
+class TimedAsyncQueuePool(TimedQueuePool, AsyncAdaptedQueuePool):
+    pass
+
+def engine_options(url: str, poolclass) -> dict:
+    options = {"pool_pre_ping": DB_POOL_PRE_PING, "pool_recycle": DB_POOL_RECYCLE}
+    # In-memory SQLite uses a single-connection pool; sizing doesn't apply
+    parsed = make_url(url)
+    if not (parsed.get_backend_name() == "sqlite" and parsed.database in (None, "", ":memory:")):
+        options.update(
+            poolclass=poolclass,
+            pool_size=DB_POOL_SIZE,
+            max_overflow=DB_MAX_OVERFLOW,
+            pool_timeout=DB_POOL_TIMEOUT,
+        )
+    return options
+
+def create_metered_engine(create, url: str, poolclass):
+    new_engine = create(url, **engine_options(url, poolclass))
+    metrics = PoolMetrics()
+    sync_engine = getattr(new_engine, "sync_engine", new_engine)
+    metrics.attach(sync_engine)
+    sync_engine.pool.metrics = metrics
+    return new_engine, metrics
+
+
+# Sync engine, kept for create_all and the command-line scripts
+engine, pool_metrics = create_metered_engine(create_engine, DATABASE_URL, TimedQueuePool)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Async engine used by the FastAPI endpoints so DB waits don't block the event loop
+async_engine, async_pool_metrics = create_metered_engine(create_async_engine, ASYNC_DATABASE_URL, TimedAsyncQueuePool)
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+# Optional read replicas, comma-separated; read-only endpoints spread over them round-robin
+DATABASE_REPLICA_URLS = [url.strip() for url in os.getenv("DATABASE_REPLICA_URLS", "").split(",") if url.strip()]
+# After a write, the client reads from the primary for this long (covers replica lag)
+READ_YOUR_WRITES_SECONDS = int(os.getenv("READ_YOUR_WRITES_SECONDS", "5"))
+READ_PRIMARY_COOKIE = "read_primary"
+
+replica_engines, replica_pool_metrics = [], []
+for url in DATABASE_REPLICA_URLS:
+    replica_engine, metrics = create_metered_engine(create_async_engine, to_async_url(url), TimedAsyncQueuePool)
+    replica_engines.append(replica_engine)
+    replica_pool_metrics.append(metrics)
+ReplicaSessionLocals = [async_sessionmaker(e, autoflush=False, expire_on_commit=False) for e in replica_engines]
+_next_replica = cycle(ReplicaSessionLocals) if ReplicaSessionLocals else None
+
 # Add a testing-specific session factory
 TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False)
 
 Base = declarative_base()
 
+# Every engine's statements feed the per-request timings and the slow-query log
+@event.listens_for(Engine, "before_cursor_execute")
+def start_query_timer(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_started_at", []).append(time.perf_counter())
+
+@event.listens_for(Engine, "after_cursor_execute")
+def stop_query_timer(conn, cursor, statement, parameters, context, executemany):
+    started_at = conn.info["query_started_at"].pop()
+    record_query(statement, parameters, executemany, time.perf_counter() - started_at)
+
+@event.listens_for(Engine, "handle_error")
+def stop_failed_query_timer(exception_context):
+    # Failed statements (e.g. a duplicate key) never reach after_cursor_execute
+    connection = exception_context.connection
+    if connection is not None and exception_context.statement and connection.info.get("query_started_at"):
+        started_at = connection.info["query_started_at"].pop()
+        executemany = bool(exception_context.execution_context and exception_context.execution_context.executemany)
+        record_query(exception_context.statement, exception_context.parameters, executemany, time.perf_counter() - started_at)
+
 def get_db():
     db = SessionLocal()
     try:
         yield db
     finally:
         db.close()
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+async def get_async_read_db(request: Request, primary: AsyncSession = Depends(get_async_db)):
+    # Sessions only check out a connection on first use, so an unused primary costs nothing
+    if _next_replica is None or request.cookies.get(READ_PRIMARY_COOKIE):
+        yield primary
+        return
+    async with next(_next_replica)() as db:
+        db.info["primary"] = primary
+        yield db
+
+def primary_of(db: AsyncSession) -> AsyncSession:
+    """The primary session behind a replica session, or None when db is the primary."""
+    return db.info.get("primary")
+
+async def dispose_engines():
+    await async_engine.dispose()
+    for replica_engine in replica_engines:
+        await replica_engine.dispose()
@@ -0,0 +1,196 @@
+# import_members.py
+# Bulk member import: streams JSON / NDJSON / CSV records, hashes passwords on a
+# process pool and writes users + VIP rows with chunked executemany inserts.
+#
+#   uv run python import_members.py members.ndjson --chunk-size 1000 --rejects rejects.ndjson
+#
+# Records use the fake_users.json shape: {"username", "password", "vip": {...}}.
+# CSV files are flat: username and password columns plus any VIPTable columns.
+# A "password_hash" field (a PASSWORD_SCHEMES hash) may replace "password" to skip hashing.
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+from pydantic import ValidationError
+from sqlalchemy import insert, select
+from sqlalchemy.exc import SQLAlchemyError
+
+from auth import PASSWORD_SCHEMES, hash_password, pwd_context
+from database import Base, engine
+from images import with_image_etag
+from models import User, VIPTable, UserCreate, VIP
+
+
+def iter_records(path: str):
+    """Yield (line, record) from a .json array, .ndjson/.jsonl or .csv file.
+
+    NDJSON lines are yielded unparsed so one malformed line is rejected by
+    validate() rather than ending the import. For JSON arrays, line is the
+    element's position.
+    """
+    extension = os.path.splitext(path)[1].lower()
+    with open(path, newline="" if extension == ".csv" else None) as f:
+        if extension == ".csv":
+            reader = csv.DictReader(f)
+            for row in reader:
+                # Empty cells fall back to the VIP model defaults
+                row = {k: v for k, v in row.items() if v not in ("", None)}
+                username, password = row.pop("username", None), row.pop("password", None)
+                password_hash = row.pop("password_hash", None)
+                yield reader.line_num, {"username": username, "password": password, "password_hash": password_hash, "vip": row}
+        elif extension in (".ndjson", ".jsonl"):
+            for number, line in enumerate(f, 1):
+                if line.strip():
+                    yield number, line
+        else:
+            # Plain JSON arrays have to be parsed whole; prefer NDJSON for large files
+            yield from enumerate(json.load(f), 1)
+
+
+def validate(record):
+    """Return (username, password_or_None, password_hash_or_None, vip_dict); ValueError if malformed."""
+    if isinstance(record, str):
+        record = json.loads(record)  # JSONDecodeError is a ValueError
+    if not isinstance(record, dict):
+        raise ValueError(f"expected an object, got {type(record).__name__}")
+    password_hash = record.get("password_hash")
+    if password_hash and (not isinstance(password_hash, str) or pwd_context.identify(password_hash) not in PASSWORD_SCHEMES):
+        # Stored as is, an unrecognised hash would make every login for the member fail
+        raise ValueError(f"password_hash: not a {'/'.join(PASSWORD_SCHEMES)} hash")
+    user = UserCreate(username=record.get("username") or "", password=record.get("password") or password_hash or "")
+    vip = record.get("vip") or {}
+    if not isinstance(vip, dict):
+        raise ValueError(f"vip: expected an object, got {type(vip).__name__}")
+    vip = dict(vip)
+    if isinstance(vip.get("img"), str):
+        try:
+            vip["img"] = bytes.fromhex(vip["img"])  # Text formats carry images hex-encoded, as /api/dashboard returns them
+        except ValueError:
+            pass
+    vip = VIP(**vip)
+    return user.username, None if password_hash else user.password, password_hash, with_image_etag(vip.model_dump())
+
+
+class MemberImporter:
+    def __init__(self, engine=engine, chunk_size: int = 1000, workers: int = None, rejects=None, log=print):
+        self.engine = engine
+        self.chunk_size = chunk_size
+        self.workers = workers or os.cpu_count() or 1
+        self.rejects = rejects
+        self.log = log
+        self.processed = 0
+        self.inserted = 0
+        self.rejected = 0
+        self.started = None
+
+    def reject(self, line: int, record, reason: str):
+        self.rejected += 1
+        if self.rejects:
+            # Unparsed or non-object records may hold a password, so only their line is kept
+            safe = {k: v for k, v in record.items() if k not in ("password", "password_hash")} if isinstance(record, dict) else None
+            self.rejects.write(json.dumps({"line": line, "reason": reason, "record": safe}, default=str) + "\n")
+
+    def existing_usernames(self) -> set:
+        with self.engine.connect() as conn:
+            return set(conn.scalars(select(User.username)))
+
+    def run(self, records) -> dict:
+        """Import (line, record) pairs, as yielded by iter_records()."""
+        Base.metadata.create_all(bind=self.engine)
+        self.started = time.perf_counter()
+        seen = self.existing_usernames()
+        records = iter(records)
+        with ProcessPoolExecutor(max_workers=self.workers) as pool:
+            while True:
+                chunk = list(islice(records, self.chunk_size))
+                if not chunk:
+                    break
+                self.import_chunk(chunk, seen, pool)
+                self.report()
+        return self.stats()
+
+    def import_chunk(self, chunk: list, seen: set, pool):
+        rows = []
+        for line, record in chunk:
+            self.processed += 1
+            try:
+                username, password, password_hash, vip = validate(record)
+            except ValidationError as e:  # Before ValueError, which it subclasses
+                self.reject(line, record, f"invalid: {e.errors()[0]['loc']} {e.errors()[0]['msg']}")
+                continue
+            except ValueError as e:
+                self.reject(line, record, f"invalid: {e}")
+                continue
+            # Usernames already in the DB or earlier in the file never reach an INSERT
+            if username in seen:
+                self.reject(line, record, "duplicate username")
+                continue
+            seen.add(username)
+            rows.append((line, record, username, password, password_hash, vip))
+
+        # bcrypt dominates the import, so spread it over every core
+        to_hash = [password for _, _, _, password, _, _ in rows if password is not None]
+        hashes = iter(pool.map(hash_password, to_hash, chunksize=max(1, len(to_hash) // (self.workers * 4))))
+        rows = [(line, record, username, password_hash or next(hashes), vip) for line, record, username, _, password_hash, vip in rows]
+        if not rows:
+            return
+        try:
+            self.insert_rows(rows)
+        except SQLAlchemyError:
+            # A concurrent signup or a value the database refuses (e.g. too long on MySQL);
+            # isolate the offending rows one by one
+            for row in rows:
+                try:
+                    self.insert_rows([row])
+                except SQLAlchemyError as e:
+                    self.reject(row[0], row[1], f"rejected by database: {getattr(e, 'orig', None) or e}")
+
+    def insert_rows(self, rows: list):
+        # One transaction per chunk: users, their ids, then the VIP rows
+        with self.engine.begin() as conn:
+            conn.execute(insert(User), [{"username": username, "password": hashed} for _, _, username, hashed, _ in rows])
+            ids = dict(conn.execute(select(User.username, User.id).where(User.username.in_([r[2] for r in rows]))).all())
+            conn.execute(insert(VIPTable), [{**vip, "IDvip": ids[username]} for _, _, username, _, vip in rows])
+        self.inserted += len(rows)
+
+    def stats(self) -> dict:
+        elapsed = time.perf_counter() - self.started if self.started else 0.0
+        return {
+            "processed": self.processed,
+            "inserted": self.inserted,
+            "rejected": self.rejected,
+            "seconds": round(elapsed, 2),
+            "rows_per_second": round(self.processed / elapsed, 1) if elapsed else 0.0,
+        }
+
+    def report(self):
+        s = self.stats()
+        self.log(f"processed={s['processed']} inserted={s['inserted']} rejected={s['rejected']} "
+                 f"elapsed={s['seconds']}s rate={s['rows_per_second']}/s")
+
+
+def import_members(path: str, chunk_size: int = 1000, workers: int = None, rejects_path: str = None, engine=engine) -> dict:
+    rejects = open(rejects_path, "w") if rejects_path else None
+    try:
+        importer = MemberImporter(engine=engine, chunk_size=chunk_size, workers=workers, rejects=rejects)
+        return importer.run(iter_records(path))
+    finally:
+        if rejects:
+            rejects.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bulk import members from JSON, NDJSON or CSV")
+    parser.add_argument("path")
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    parser.add_argument("--workers", type=int, default=None, help="Password hashing processes (default: CPU count)")
+    parser.add_argument("--rejects", default=None, help="Write rejected rows with reasons to this NDJSON file")
+    args = parser.parse_args()
+    stats = import_members(args.path, args.chunk_size, args.workers, args.rejects)
+    print(json.dumps(stats))
+    sys.exit(0 if stats["rejected"] == 0 else 1)
@@ -0,0 +1,66 @@
+# jwt_cache.py
+import os
+import time
+from collections import OrderedDict
+from revocation import token_digest
+
+JWT_CACHE_SIZE = int(os.getenv("JWT_CACHE_SIZE", "10000"))
+
+
+class ClaimsCache:
+    """Verified JWT claims keyed by the digest of the whole token, signature included.
+
+    Only a byte-identical copy of a token that already passed HMAC verification can
+    hit, so a hit is as good as re-verifying. Entries go at the token's exp, on
+    logout, or least recently used first once max_tokens is reached. Revocation and
+    token_version checks still run on every request; this only skips the decode.
+    """
+
+    def __init__(self, max_tokens: int = JWT_CACHE_SIZE, clock=time.time):
+        self.max_tokens = max_tokens
+        self.clock = clock
+        self._claims = OrderedDict()  # digest -> claims
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+
+    def get(self, token: str):
+        digest = token_digest(token)
+        claims = self._claims.get(digest)
+        if claims is None:
+            self.misses += 1
+            return None
+        if claims["exp"] <= self.clock():
+            # Let the caller decode it again so python-jose reports the expiry
+            del self._claims[digest]
+            self.expired += 1
+            self.misses += 1
+            return None
+        self._claims.move_to_end(digest)
+        self.hits += 1
+        return claims
+
+    def put(self, token: str, claims: dict):
+        if self.max_tokens <= 0 or "exp" not in claims:
+            return
+        self._claims[token_digest(token)] = claims
+        if len(self._claims) > self.max_tokens:
+            self._claims.popitem(last=False)
+
+    def invalidate(self, token: str):
+        self._claims.pop(token_digest(token), None)
+
+    def reset(self):
+        self.__init__(self.max_tokens, self.clock)
+
+    def stats(self) -> dict:
+        return {
+            "tokens": len(self._claims),
+            "max_tokens": self.max_tokens,
+            "hits": self.hits,
+            "misses": self.misses,
+            "expired": self.expired,
+        }
+
+
+claims_cache = ClaimsCache()
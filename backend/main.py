@@ -1,100 +1,421 @@
-from fastapi import FastAPI, Form, Depends, HTTPException, status
-from fastapi.security import OAuth2PasswordBearer
-from fastapi.responses import StreamingResponse  # Add this import
-from sqlalchemy.orm import Session
-from auth import hash_password, verify_password, create_access_token, verify_token
-import barcode  # This should work if python-barcode is installed
-from barcode.writer import ImageWriter
-from io import BytesIO
-
-from database import get_db, Base, engine
+import asyncio
+import json
+import os
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, File, Form, Depends, Header, HTTPException, Query, Request, Response, UploadFile
+from fastapi.responses import ORJSONResponse
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+from pydantic import ValidationError
+from sqlalchemy.orm import Load
+from sqlalchemy.ext.asyncio import AsyncSession
+from auth import hash_password_async, verify_and_update_password_async, create_access_token, verify_token, hash_pool, login_limiter
+from auth import issue_refresh_token, rotate_refresh_token, revoke_refresh_token, revoke_all_sessions, token_response
+from auth import oauth2_scheme, get_current_member, verify_token_payload, load_member, CurrentMember
+from barcodes import WRITER_OPTIONS, MEDIA_TYPES, barcode_etag, can_encode_code128, get_barcode_image, barcode_cache, barcode_pool
+from typing import Literal, Optional
+from images import THUMBNAIL_SIZES, THUMBNAIL_CONTENT_TYPE, IMAGE_MAX_BYTES, image_etag, with_image_etag, sniff_content_type, make_thumbnails_async, image_pool
+
+from database import get_async_db, get_async_read_db, primary_of, AsyncSessionLocal, Base, engine, dispose_engines
+from database import async_pool_metrics, replica_pool_metrics, READ_PRIMARY_COOKIE, READ_YOUR_WRITES_SECONDS
+from ratelimit import client_ip
+from jwt_cache import claims_cache
+from metrics import MetricsMiddleware, PROMETHEUS_CONTENT_TYPE, render_gauges, request_metrics
+from timing import TimingMiddleware, timed
+from revocation import revocation_cache, revocation_digest, expiry_of, run_purge_loop, token_versions
+from jose import jwt
 from models import *
 
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Load the token blacklist before serving authenticated requests
+    async with AsyncSessionLocal() as db:
+        await revocation_cache.refresh(db)
+    purge_task = asyncio.create_task(run_purge_loop(AsyncSessionLocal))
+    yield
+    purge_task.cancel()
+    hash_pool.shutdown()
+    barcode_pool.shutdown()
+    image_pool.shutdown()
+    await dispose_engines()
+
+
+app = FastAPI(lifespan=lifespan, default_response_class=ORJSONResponse)
 Base.metadata.create_all(bind=engine)
+app.add_middleware(MetricsMiddleware, metrics=request_metrics)
+app.add_middleware(TimingMiddleware)
 
-oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/login")
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    # If-None-Match uses weak comparison: W/"x" (as some proxies rewrite it) matches "x"
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return etag.removeprefix("W/") in [t.strip().removeprefix("W/") for t in if_none_match.split(",")]
+
+def read_your_writes(response: Response):
+    # Keeps this client's reads on the primary until replicas have caught up
+    response.set_cookie(READ_PRIMARY_COOKIE, "1", max_age=READ_YOUR_WRITES_SECONDS, httponly=True)
+
+def image_variants(vip_id: int, thumbnails: dict) -> list:
+    # Thumbnails are generated once, when the image is stored
+    return [
+        VIPImage(IDvip=vip_id, size=size, content_type=THUMBNAIL_CONTENT_TYPE, etag=image_etag(thumb), data=thumb)
+        for size, thumb in thumbnails.items()
+    ]
 
 @app.post("/api/register")
-async def register(username: str = Form(...), password: str = Form(...), db: Session = Depends(get_db)):
-    if db.query(User).filter(User.username == username).first():
-        raise HTTPException(status_code=400, detail="Username already taken")
-    hashed_password = hash_password(password)
+async def register(response: Response, username: str = Form(...), password: str = Form(...), db: AsyncSession = Depends(get_async_db)):
+    hashed_password = await hash_password_async(password)
     new_user = User(username=username, password=hashed_password)
     db.add(new_user)
-    db.commit()
+    try:
+        await db.commit()
+    except IntegrityError:
+        # The unique constraint on username catches duplicates, even concurrent ones
+        await db.rollback()
+        raise HTTPException(status_code=400, detail="Username already taken")
+    read_your_writes(response)
     return {"message": "User registered successfully"}
 
 @app.post("/signup/")
-async def signup(user: UserCreate, vip: VIP, db: Session = Depends(get_db)):
-    # Create user
-    if db.query(User).filter(User.username == user.username).first():
-        raise HTTPException(status_code=400, detail="Username already taken")
-    hashed_password = hash_password(user.password)
+async def signup(user: UserCreate, vip: VIP, response: Response, db: AsyncSession = Depends(get_async_db)):
+    # CPU work happens before the transaction starts
+    hashed_password = await hash_password_async(user.password)
+    thumbnails = {}
+    if vip.img:
+        try:
+            thumbnails = await make_thumbnails_async(vip.img)
+        except ValueError:
+            pass  # Keep the original bytes; /api/vip/image serves them without variants
+
+    # Create user; flush sends the INSERT and gives us the id without committing
     db_user = User(username=user.username, password=hashed_password)
     db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
-
+    try:
+        await db.flush()
+    except IntegrityError:
+        # The unique constraint on username catches duplicates, even concurrent ones
+        await db.rollback()
+        raise HTTPException(status_code=400, detail="Username already taken")
 
     # Create VIP with IDvip = userid
 #     vip_data = vip.dict()  # Convert Pydantic model to dict
-    vip_data = vip.model_dump()   # Convert Pydantic model to dict
+    vip_data = with_image_etag(vip.model_dump())   # Convert Pydantic model to dict
     vip_data["IDvip"] = db_user.id  # Add IDvip to the dict
     db_vip = VIPTable(**vip_data)  # Pass the updated dict to SQLAlchemy
     db.add(db_vip)
-    db.commit()
+    db.add_all(image_variants(db_user.id, thumbnails))
+    await db.commit()  # User and VIP rows land together
+    read_your_writes(response)
     return {"message": "User and VIP registered", "userid": db_user.id}
 
 
+SIGNUP_BATCH_MAX_ITEMS = int(os.getenv("SIGNUP_BATCH_MAX_ITEMS", "1000"))
+SIGNUP_BATCH_MAX_BYTES = int(os.getenv("SIGNUP_BATCH_MAX_BYTES", str(16 * 1024 * 1024)))
+
+async def read_body_capped(request: Request, max_bytes: int = None):
+    # Oversized bodies are refused before they're buffered or parsed: up front when
+    # Content-Length says so, otherwise (chunked uploads) as soon as the count passes it
+    max_bytes = max_bytes or SIGNUP_BATCH_MAX_BYTES
+    too_large = HTTPException(status_code=413, detail=f"Batch body larger than {max_bytes} bytes")
+    content_length = request.headers.get("content-length", "")
+    if content_length.isdigit() and int(content_length) > max_bytes:
+        raise too_large
+    received = 0
+    async for chunk in request.stream():
+        received += len(chunk)
+        if received > max_bytes:
+            raise too_large
+        yield chunk
+
+async def read_batch(request: Request) -> list:
+    # JSON array body, or NDJSON (one member per line) read as it streams in
+    if request.headers.get("content-type", "").startswith("application/x-ndjson"):
+        items, buffer = [], b""
+        async for chunk in read_body_capped(request):
+            *lines, buffer = (buffer + chunk).split(b"\n")
+            items.extend(line for line in lines if line.strip())
+            if len(items) > SIGNUP_BATCH_MAX_ITEMS:
+                break
+        if buffer.strip():
+            items.append(buffer)
+        parsed = []
+        for line in items:
+            try:
+                parsed.append(json.loads(line))
+            except ValueError:
+                parsed.append(None)  # Reported as an invalid item
+    else:
+        try:
+            parsed = json.loads(b"".join([chunk async for chunk in read_body_capped(request)]))
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Malformed JSON body")
+        if not isinstance(parsed, list):
+            raise HTTPException(status_code=400, detail="Expected a JSON array of members")
+    if len(parsed) > SIGNUP_BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=413, detail=f"At most {SIGNUP_BATCH_MAX_ITEMS} members per batch")
+    return parsed
+
+async def insert_members(db: AsyncSession, members: list) -> dict:
+    # members: [(username, hashed_password, vip_dict)]; returns {username: id}
+    await db.execute(insert(User), [{"username": u, "password": p} for u, p, _ in members])
+    ids = dict((await db.execute(select(User.username, User.id).where(User.username.in_([u for u, _, _ in members])))).all())
+    await db.execute(insert(VIPTable), [{**vip, "IDvip": ids[u]} for u, _, vip in members])
+    return ids
+
+@app.post("/signup/batch")
+async def signup_batch(request: Request, response: Response, db: AsyncSession = Depends(get_async_db)):
+    raw_items = await read_batch(request)
+    results = [None] * len(raw_items)
+    valid = {}  # username -> (index, SignupItem)
+
+    # Validate every item on its own so one bad member doesn't fail the batch
+    for index, raw in enumerate(raw_items):
+        try:
+            item = SignupItem.model_validate(raw)
+        except ValidationError as e:
+            error = e.errors()[0]
+            results[index] = {"index": index, "status": "error", "detail": f"{'.'.join(map(str, error['loc']))}: {error['msg']}"}
+            continue
+        if item.user.username in valid:
+            results[index] = {"index": index, "status": "error", "detail": "Duplicate username in batch"}
+            continue
+        valid[item.user.username] = (index, item)
+
+    # One IN query for every username in the batch
+    if valid:
+        taken = await db.scalars(select(User.username).where(User.username.in_(list(valid))))
+        for username in taken:
+            index, _ = valid.pop(username)
+            results[index] = {"index": index, "status": "error", "detail": "Username already taken"}
+
+    # Hash on the worker pool, a window at a time so the batch can't overflow its queue
+    pending = list(valid.values())
+    hashes = []
+    window = hash_pool.workers * 2
+    for start in range(0, len(pending), window):
+        hashes += await asyncio.gather(*(hash_password_async(item.user.password) for _, item in pending[start:start + window]))
+    members = [(item.user.username, hashed, with_image_etag(item.vip.model_dump())) for (_, item), hashed in zip(pending, hashes)]
+
+    ids = {}
+    if members:
+        try:
+            ids = await insert_members(db, members)
+            await db.commit()
+        except SQLAlchemyError:
+            # Lost a race with a concurrent signup, or the database refused a value;
+            # retry one savepoint per member so only the offending rows fail
+            await db.rollback()
+            for member in members:
+                index, _ = valid[member[0]]
+                try:
+                    async with db.begin_nested():
+                        ids.update(await insert_members(db, [member]))
+                except IntegrityError:
+                    results[index] = {"index": index, "status": "error", "detail": "Username already taken"}
+                except SQLAlchemyError as e:
+                    results[index] = {"index": index, "status": "error", "detail": f"Rejected by database: {type(e).__name__}"}
+            await db.commit()
+
+    for username, userid in ids.items():
+        index, _ = valid[username]
+        results[index] = {"index": index, "status": "created", "username": username, "userid": userid}
+    created = len(ids)
+    if created:
+        read_your_writes(response)
+    return {"created": created, "failed": len(results) - created, "results": results}
+
+
 @app.post("/api/login")
-async def login(username: str = Form(...), password: str = Form(...), db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.username == username).first()
-    if not user or not verify_password(password, user.password):
-        raise HTTPException(status_code=401, detail="Invalid credentials")
-    token = create_access_token(data={"sub": username})
-    return {"access_token": token, "token_type": "bearer"}
+async def login(request: Request, username: str = Form(...), password: str = Form(...), db: AsyncSession = Depends(get_async_read_db)):
+    # Rate limits and the concurrency cap run before any DB or bcrypt work
+    await login_limiter.check(client_ip(request), username)
+    with login_limiter:
+        query = select(User).where(User.username == username)
+        user = await db.scalar(query)
+        if not user and primary_of(db) is not None:
+            # Replica may not have caught up with a fresh signup yet
+            user = await primary_of(db).scalar(query)
+            await primary_of(db).close()
+        # Hand the connection back to the pool before spending ~100ms in bcrypt
+        await db.close()
+        if not user:
+            raise HTTPException(status_code=401, detail="Invalid credentials")
+        verified, new_hash = await verify_and_update_password_async(password, user.password)
+        if not verified:
+            raise HTTPException(status_code=401, detail="Invalid credentials")
+    # The refresh token is a write, so it goes to the primary even when the lookup used a replica
+    writer = primary_of(db) or db
+    refresh_token = issue_refresh_token(writer, user.id)
+    if new_hash:
+        # Rehash to the configured scheme/cost; skipped if the password changed meanwhile
+        await writer.execute(
+            update(User).where(User.id == user.id, User.password == user.password).values(password=new_hash)
+        )
+    await writer.commit()
+    token_version = user.token_version
+    if primary_of(db) is not None:
+        # Tokens are checked against the primary's token_version; a lagging replica may
+        # still hold the value from before a "log out all devices"
+        token_version = await writer.scalar(select(User.token_version).where(User.id == user.id))
+    token = create_access_token(data={"sub": username, "uid": user.id, "ver": token_version})
+    return token_response(token, refresh_token)
+
+@app.post("/api/refresh")
+async def refresh(refresh_token: str = Form(...), db: AsyncSession = Depends(get_async_db)):
+    # Keeps a session alive without the password: a new access token and a rotated refresh token
+    return await rotate_refresh_token(db, refresh_token)
 
 @app.post("/api/logout")
-async def logout(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
-    username = verify_token(token, db)
+async def logout(
+    token: str = Depends(oauth2_scheme),
+    refresh_token: Optional[str] = Form(None),
+    db: AsyncSession = Depends(get_async_db),
+):
+    username = await verify_token(token, db)
     if not username:
         raise HTTPException(status_code=401, detail="Invalid or expired token")
-    # Add token to blacklist
-    blacklisted = BlacklistedToken(token=token)
+    # Add token to blacklist, keyed by its jti digest until it would have expired anyway
+    payload = jwt.get_unverified_claims(token)  # Signature already checked by verify_token
+    blacklisted = BlacklistedToken(digest=revocation_digest(token, payload), expires_at=expiry_of(payload))
     db.add(blacklisted)
-    db.commit()
+    await db.commit()
+    revocation_cache.add(blacklisted.digest, blacklisted.expires_at)
+    claims_cache.invalidate(token)
+    if refresh_token:
+        # Ends the whole login: every rotation of this refresh token stops working
+        await revoke_refresh_token(db, refresh_token)
     return {"message": "Logged out successfully"}
 
-# New endpoint to generate barcode
-@app.get("/api/barcode")
-async def get_barcode(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
-    # Verify the token and get the username
-    username = verify_token(token, db)
-    if not username:
-        raise HTTPException(status_code=401, detail="Invalid or expired token")
+@app.post("/api/logout/all")
+async def logout_all(response: Response, token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_async_db)):
+    payload = await verify_token_payload(token, db)
+    if "uid" not in payload:
+        # Tokens issued before uid existed carry no version, so a bump couldn't revoke them
+        raise HTTPException(status_code=401, detail="Invalid token, please log in again")
+    await revoke_all_sessions(db, payload["uid"])
+    claims_cache.invalidate(token)
+    read_your_writes(response)
+    return {"message": "Logged out from all devices"}
 
-    # Fetch the user and their VIP data
-    user = db.query(User).filter(User.username == username).first()
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
+@app.get("/api/stats")
+async def stats():
+    # Worker pool health: queue depth and time spent waiting for a slot
+    return {
+        "hash_pool": hash_pool.stats(),
+        "barcode_pool": barcode_pool.stats(),
+        "barcode_cache": barcode_cache.stats(),
+        "revocation_cache": revocation_cache.stats(),
+        "token_versions": token_versions.stats(),
+        "jwt_cache": claims_cache.stats(),
+        "login_limiter": login_limiter.stats(),
+        "db_pool": async_pool_metrics.stats(),
+        "db_replica_pools": [metrics.stats() for metrics in replica_pool_metrics],
+    }
 
-    vip = db.query(VIPTable).filter(VIPTable.IDvip == user.id).first()
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    # Prometheus scrape target: request metrics plus the worker pool and cache stats above
+    lines = request_metrics.render()
+    for name, pool in (("hash", hash_pool), ("barcode", barcode_pool), ("image", image_pool)):
+        lines += render_gauges("worker_pool", pool.stats(), pool=name)
+    lines += render_gauges("db_pool", async_pool_metrics.stats(), node="primary")
+    for index, replica_metrics in enumerate(replica_pool_metrics):
+        lines += render_gauges("db_pool", replica_metrics.stats(), node=f"replica{index}")
+    lines += render_gauges("barcode_cache", barcode_cache.stats())
+    lines += render_gauges("revocation_cache", revocation_cache.stats())
+    lines += render_gauges("token_versions", token_versions.stats())
+    lines += render_gauges("jwt_cache", claims_cache.stats())
+    lines += render_gauges("login_limiter", login_limiter.stats())
+    return Response(content="\n".join(lines) + "\n", media_type=PROMETHEUS_CONTENT_TYPE)
+
+# New endpoint to generate barcode
+@app.get("/api/barcode")
+async def get_barcode(
+    member: CurrentMember = Depends(get_current_member),
+    barcode_format: Literal["png", "svg"] = Query("png", alias="format"),
+    if_none_match: Optional[str] = Header(None),
+):
+    vip = member.vip
     if not vip or not vip.code:
         raise HTTPException(status_code=404, detail="VIP membership not found")
+    if not can_encode_code128(vip.code):
+        raise HTTPException(status_code=422, detail="VIP code cannot be encoded as a Code128 barcode")
+
+    # The image only depends on the code, so clients can revalidate without any rendering
+    options = WRITER_OPTIONS if barcode_format == "png" else {"format": "SVG"}
+    etag = barcode_etag(vip.code, options)
+    headers = {"ETag": etag, "Cache-Control": "private, max-age=86400"}
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+
+    # Generate (or reuse a cached) Code128 barcode off the event loop
+    data = await get_barcode_image(vip.code, options)
+    extension = options["format"].lower()
+    headers["Content-Disposition"] = f"inline; filename={vip.code}.{extension}"
+    return Response(content=data, media_type=MEDIA_TYPES[options["format"]], headers=headers)
 
-    # Generate Code128 barcode
-    code128 = barcode.get_barcode_class('code128')
-    barcode_instance = code128(vip.code, writer=ImageWriter())
 
-    # Save barcode to a BytesIO buffer (in-memory)
-    buffer = BytesIO()
-    barcode_instance.write(buffer)
-    buffer.seek(0)
+@app.get("/api/vip/image")
+async def get_vip_image(
+    size: Optional[int] = Query(None, description="Thumbnail size in pixels; the original when omitted"),
+    if_none_match: Optional[str] = Header(None),
+    member: CurrentMember = Depends(get_current_member),
+    db: AsyncSession = Depends(get_async_read_db),
+):
+    if size is not None and size not in THUMBNAIL_SIZES:
+        raise HTTPException(status_code=400, detail=f"size must be one of {', '.join(map(str, THUMBNAIL_SIZES))}")
+    vip_id = member.user.id
 
-    # Return the image as a streaming response
-    return StreamingResponse(buffer, media_type="image/png", headers={"Content-Disposition": f"inline; filename={vip.code}.png"})
+    if size is None:
+        # The etag stored at upload comes with the member row, so a 304 never reads the blob
+        etag = member.vip.img_etag if member.vip else None
+        if etag and etag_matches(if_none_match, etag):
+            return Response(status_code=304, headers={"ETag": etag, "Cache-Control": "private, max-age=86400"})
+        data = await db.scalar(select(VIPTable.img).where(VIPTable.IDvip == vip_id))
+        if not data:
+            raise HTTPException(status_code=404, detail="Image not found")
+        content_type, etag = sniff_content_type(data), etag or image_etag(data)  # Rows written before img_etag
+    else:
+        variant = await db.scalar(select(VIPImage).where(VIPImage.IDvip == vip_id, VIPImage.size == size))
+        if not variant:
+            raise HTTPException(status_code=404, detail="Image not found")
+        data, content_type, etag = variant.data, variant.content_type, variant.etag
+
+    headers = {"ETag": etag, "Cache-Control": "private, max-age=86400"}
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=data, media_type=content_type, headers=headers)
+
+@app.put("/api/vip/image")
+async def upload_vip_image(
+    response: Response,
+    file: UploadFile = File(...),
+    token: str = Depends(oauth2_scheme),
+    db: AsyncSession = Depends(get_async_db),
+):
+    payload = await verify_token_payload(token, db)
+    user, vip = await load_member(db, payload)
+    if not vip:
+        raise HTTPException(status_code=404, detail="VIP data not found")
+
+    data = await file.read(IMAGE_MAX_BYTES + 1)
+    if len(data) > IMAGE_MAX_BYTES:
+        raise HTTPException(status_code=413, detail=f"Image larger than {IMAGE_MAX_BYTES} bytes")
+    try:
+        variants = image_variants(vip.IDvip, await make_thumbnails_async(data))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid image")
+
+    # Replace the original and its thumbnails together
+    vip.img, vip.img_etag = data, image_etag(data)
+    await db.execute(delete(VIPImage).where(VIPImage.IDvip == vip.IDvip))
+    db.add_all(variants)
+    await db.commit()
+    read_your_writes(response)
+    return {"message": "Image updated", "sizes": list(THUMBNAIL_SIZES)}
 
 
 # @app.get("/api/dashboard")
@@ -105,68 +426,32 @@ async def get_barcode(token: str = Depends(oauth2_scheme), db: Session = Depends
 #     user = db.query(User).filter(User.username == username).first()
 #     return {"username": user.username, "message": "Welcome to your dashboard"}
 # upgraded version of dashboard
-@app.get("/api/dashboard")
-async def dashboard(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
-    username = verify_token(token, db)
-    if not username:
-        raise HTTPException(status_code=401, detail="Invalid or expired token")
+@app.get("/api/dashboard", response_model=DashboardOut)
+async def dashboard(
+    fields: Optional[str] = Query(None, description="Comma-separated VIP columns to return; all when omitted"),
+    token: str = Depends(oauth2_scheme),
+    db: AsyncSession = Depends(get_async_read_db),
+):
+    # Only SELECT the requested columns; deferred groups load only when asked for
+    if fields:
+        columns = {"IDvip"} | {f.strip() for f in fields.split(",") if f.strip()}
+        unknown = columns - set(VIP_FIELDS)
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(sorted(unknown))}")
+        options = [Load(VIPTable).load_only(*[getattr(VIPTable, c) for c in columns])]
+    else:
+        columns = set(VIP_FIELDS)
+        options = [Load(VIPTable).undefer_group(group) for group in VIP_DEFERRED_GROUPS]
 
-    # Fetch user and VIP data
-    user = db.query(User).filter(User.username == username).first()
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
-
-    vip = db.query(VIPTable).filter(VIPTable.IDvip == user.id).first()
+    # User and VIP data come from the shared single-query loader
+    payload = await verify_token_payload(token, db)
+    user, vip = await load_member(db, payload, *options)
     if not vip:
         raise HTTPException(status_code=404, detail="VIP data not found")
 
-    # Construct response with all relevant data
-    response = {
-        "username": user.username,
-        "vip": {
-            "IDvip": vip.IDvip,
-            "code": vip.code,
-            "nascita": vip.nascita,
-            "cellulare": vip.cellulare,
-            "sms": vip.sms,
-            "Punti": vip.Punti,
-            "Sconto": vip.Sconto,
-            "Ck": vip.Ck,
-            "idata": vip.idata.isoformat() if vip.idata else None,
-            "ioperatore": vip.ioperatore,
-            "inegozio": vip.inegozio,
-            "P_cs": vip.P_cs,
-            "P_ldata": vip.P_ldata,
-            "P_importo": float(vip.P_importo) if vip.P_importo is not None else 0.00,  # Convert Decimal to float
-            "Nome": vip.Nome,
-            "Indirizzo": vip.Indirizzo,
-            "Cap": vip.Cap,
-            "Citta": vip.Citta,
-            "Prov": vip.Prov,
-            "CodiceFiscale": vip.CodiceFiscale,
-            "PartitaIva": vip.PartitaIva,
-            "Email": vip.Email,
-            "sesso": vip.sesso,
-            "VIPanno": vip.VIPanno,
-            "maps": vip.maps,
-            "VIPscadenza": vip.VIPscadenza,
-            "Blocco": vip.Blocco,
-            "cognome": vip.cognome,
-            "SerBlocco": vip.SerBlocco,
-            "SerBloccoBz": vip.SerBloccoBz,
-            "omail": vip.omail,
-            "oposte": vip.oposte,
-            "msg": vip.msg,
-            "msgstr": vip.msgstr,
-            "utime": vip.utime,
-            "upc": vip.upc,
-            "uzt": vip.uzt,
-            "un": vip.un,
-            "lotteria": vip.lotteria,
-            "statoanno": vip.statoanno,
-            "img": vip.img.hex() if vip.img else None,  # Convert bytes to hex string
-            "n": vip.n,
-            "SCOscadenza": vip.SCOscadenza,
-        }
-    }
-    return response
+    # Serialize straight from the loaded columns to JSON bytes in one pass
+    with timed("serialize"):
+        vip_out = VIPOut.model_validate({c: getattr(vip, c) for c in columns})
+        response = DashboardOut(username=user.username, vip=vip_out)
+        content = response.model_dump_json(include={"username": True, "vip": columns})
+    return Response(content=content, media_type="application/json")
@@ -0,0 +1,122 @@
+# metrics.py
+# Request metrics in the Prometheus text format, without the prometheus_client dependency.
+# Counters are per worker process; Prometheus sums them across workers when scraping each one.
+import time
+from bisect import bisect_left
+
+# Upper bounds, in seconds, of the latency histogram buckets
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def format_labels(labels: dict) -> str:
+    if not labels:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for v in labels.values())
+    return "{" + ",".join(f'{k}="{v}"' for k, v in zip(labels, escaped)) + "}"
+
+
+class Histogram:
+    """Cumulative-bucket histogram keyed by a label tuple."""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self._series = {}  # labels -> [bucket counts..., +Inf count, sum]
+
+    def observe(self, labels: tuple, value: float):
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+        # Non-cumulative while recording; render() accumulates
+        series[bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def render(self, name: str, label_names: tuple) -> list:
+        lines = []
+        for labels, series in self._series.items():
+            base = dict(zip(label_names, labels))
+            cumulative = 0
+            for bound, count in zip(self.buckets + ("+Inf",), series):
+                cumulative += count
+                lines.append(f"{name}_bucket{format_labels({**base, 'le': bound})} {cumulative}")
+            lines.append(f"{name}_sum{format_labels(base)} {series[-1]:.6f}")
+            lines.append(f"{name}_count{format_labels(base)} {cumulative}")
+        return lines
+
+
+class RequestMetrics:
+    """Request count, in-flight gauge and latency histogram per method, route and status."""
+
+    LABELS = ("method", "route", "status")
+
+    def __init__(self):
+        self.requests = {}  # (method, route, status) -> count
+        self.in_flight = 0
+        self.latency = Histogram()
+
+    def record(self, method: str, route: str, status: int, seconds: float):
+        labels = (method, route, str(status))
+        self.requests[labels] = self.requests.get(labels, 0) + 1
+        self.latency.observe(labels, seconds)
+
+    def reset(self):
+        self.__init__()
+
+    def render(self) -> list:
+        lines = [
+            "# HELP http_requests_total Requests handled, by method, route template and status code.",
+            "# TYPE http_requests_total counter",
+        ]
+        lines += [f"http_requests_total{format_labels(dict(zip(self.LABELS, k)))} {v}" for k, v in self.requests.items()]
+        lines += [
+            "# HELP http_requests_in_flight Requests currently being handled.",
+            "# TYPE http_requests_in_flight gauge",
+            f"http_requests_in_flight {self.in_flight}",
+            "# HELP http_request_duration_seconds Time from receiving a request to sending its last body chunk.",
+            "# TYPE http_request_duration_seconds histogram",
+        ]
+        lines += self.latency.render("http_request_duration_seconds", self.LABELS)
+        return lines
+
+
+def render_gauges(name: str, stats: dict, **labels) -> list:
+    # Numeric entries of a stats() dict as gauges, e.g. hash_pool_queue_depth{pool="hash"}
+    lines = []
+    for key, value in stats.items():
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            lines.append(f"{name}_{key}{format_labels(labels)} {value}")
+    return lines
+
+
+class MetricsMiddleware:
+    """Plain ASGI middleware: no per-request task or body buffering, cheap enough to leave on."""
+
+    def __init__(self, app, metrics: RequestMetrics):
+        self.app = app
+        self.metrics = metrics
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        status = 500
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        metrics = self.metrics
+        metrics.in_flight += 1
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            metrics.in_flight -= 1
+            # Route templates (/api/vip/image), not raw paths, keep label cardinality bounded
+            route = scope.get("route")
+            metrics.record(scope["method"], route.path if route else "unmatched", status, time.perf_counter() - start)
+
+
+request_metrics = RequestMetrics()
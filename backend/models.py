@@ -1,8 +1,9 @@
 from sqlalchemy import create_engine, Column, Integer, String, Boolean, DECIMAL, LargeBinary, DateTime
+from sqlalchemy.orm import deferred
 from sqlalchemy.sql import func
 from database import Base
 from datetime import datetime, timedelta # Import for default value
-from pydantic import BaseModel, ConfigDict, Field
+from pydantic import BaseModel, ConfigDict, Field, field_validator
 from typing import Optional
 import decimal
 
@@ -12,15 +13,30 @@ class User(Base):
     id = Column(Integer, primary_key=True, index=True)
     username = Column(String(50), unique=True, nullable=False)
     password = Column(String(255), nullable=False)
+    # Embedded in access tokens as "ver"; bumping it revokes every token issued before
+    token_version = Column(Integer, nullable=False, default=0, server_default="0")
 
 class BlacklistedToken(Base):
     __tablename__ = "blacklisted_tokens"
     id = Column(Integer, primary_key=True, index=True)
-    token = Column(String(512), nullable=False, index=True)
-    blacklisted_at = Column(DateTime, default=datetime.utcnow)
+    digest = Column(String(64), nullable=False, unique=True)  # SHA-256 hex of the token's jti
+    expires_at = Column(DateTime, nullable=False, index=True)  # Token exp; the row is purged after it
+    blacklisted_at = Column(DateTime, default=datetime.utcnow, index=True)  # Refresh re-reads recent rows by it
+
+class RefreshToken(Base):
+    # Long-lived, single-use tokens; each rotation adds a row to the login's family
+    __tablename__ = "refresh_tokens"
+    id = Column(Integer, primary_key=True)
+    digest = Column(String(64), nullable=False, unique=True)  # SHA-256 hex; the token itself is never stored
+    user_id = Column(Integer, nullable=False, index=True)
+    family = Column(String(32), nullable=False, index=True)  # Every rotation of one login shares it
+    expires_at = Column(DateTime, nullable=False, index=True)
+    used_at = Column(DateTime, nullable=True)  # Set on rotation; presenting it again revokes the family
 
 
 class VIPTable(Base):
+    # Rarely read columns are deferred: "media" holds the profile image and "pos"
+    # the till/back-office bookkeeping fields. They load only when asked for.
     __tablename__ = "viptest"
     IDvip = Column(Integer, primary_key=True)
     code = Column(String(13), nullable=True)
@@ -29,11 +45,11 @@ class VIPTable(Base):
     sms = Column(Boolean, default=False)
     Punti = Column(Integer, nullable=True)
     Sconto = Column(Integer, nullable=True)
-    Ck = Column(String(255), nullable=True)
+    Ck = deferred(Column(String(255), nullable=True), group="pos")
     idata = Column(DateTime, default=func.current_timestamp())
-    ioperatore = Column(Integer, nullable=True)
+    ioperatore = deferred(Column(Integer, nullable=True), group="pos")
     inegozio = Column(Integer, nullable=True)
-    P_cs = Column(Integer, default=0)
+    P_cs = deferred(Column(Integer, default=0), group="pos")
     P_ldata = Column(String(255), nullable=True)
     P_importo = Column(DECIMAL(10, 2), default="0.00")
     Nome = Column(String(255), nullable=True)
@@ -50,30 +66,41 @@ class VIPTable(Base):
     VIPscadenza = Column(String(255), nullable=True)
     Blocco = Column(Integer, default=0)
     cognome = Column(String(255), default="")
-    SerBlocco = Column(Integer, default=0)
-    SerBloccoBz = Column(String(255), default="")
+    SerBlocco = deferred(Column(Integer, default=0), group="pos")
+    SerBloccoBz = deferred(Column(String(255), default=""), group="pos")
     omail = Column(Boolean, default=False)
     oposte = Column(Boolean, default=False)
-    msg = Column(Integer, default=0)
-    msgstr = Column(String(255), default="")
+    msg = deferred(Column(Integer, default=0), group="pos")
+    msgstr = deferred(Column(String(255), default=""), group="pos")
     utime = Column(String(255), default="")
-    upc = Column(String(255), default="")
-    uzt = Column(Integer, default=0)
-    un = Column(String(255), default="")
+    upc = deferred(Column(String(255), default=""), group="pos")
+    uzt = deferred(Column(Integer, default=0), group="pos")
+    un = deferred(Column(String(255), default=""), group="pos")
     lotteria = Column(String(20), default="")
     statoanno = Column(String(10), default="")
-    img = Column(LargeBinary, nullable=True)
-    n = Column(String(255), default="")
+    img = deferred(Column(LargeBinary, nullable=True), group="media")
+    img_etag = Column(String(66), nullable=True)  # Set with img; small, so it loads with the row
+    n = deferred(Column(String(255), default=""), group="pos")
     SCOscadenza = Column(String(20), default="")
 
 
+class VIPImage(Base):
+    # Resized copies of VIPTable.img, generated when the image is uploaded
+    __tablename__ = "vip_images"
+    IDvip = Column(Integer, primary_key=True)
+    size = Column(Integer, primary_key=True)  # Longest side in pixels
+    content_type = Column(String(50), nullable=False)
+    etag = Column(String(66), nullable=False)
+    data = Column(LargeBinary, nullable=False)
+
+
 # Pydantic Models
 class UserBase(BaseModel):
     userid: int
     username: str
 
 class UserCreate(BaseModel):
-    username: str = Field(..., min_length=1)  # Non-empty string
+    username: str = Field(..., min_length=1, max_length=50)  # Non-empty, fits users.username
     password: str = Field(..., min_length=1)  # Non-empty string for good measure
     # No userid here; it's auto-generated by the database
 
@@ -123,4 +150,76 @@ class VIP(BaseModel):
     SCOscadenza: str = ""
 
     model_config = ConfigDict(arbitrary_types_allowed=True)
-
+
+
+class SignupItem(BaseModel):
+    # One member in a /signup/batch request
+    user: UserCreate
+    vip: VIP = Field(default_factory=VIP)
+
+class VIPOut(BaseModel):
+    # VIP row as returned by /api/dashboard, built straight from the ORM object
+    model_config = ConfigDict(from_attributes=True)
+
+    IDvip: int
+    code: Optional[str] = None
+    nascita: Optional[str] = None
+    cellulare: Optional[str] = None
+    sms: Optional[bool] = None
+    Punti: Optional[int] = None
+    Sconto: Optional[int] = None
+    Ck: Optional[str] = None
+    idata: Optional[datetime] = None
+    ioperatore: Optional[int] = None
+    inegozio: Optional[int] = None
+    P_cs: Optional[int] = None
+    P_ldata: Optional[str] = None
+    P_importo: float = 0.00
+    Nome: Optional[str] = None
+    Indirizzo: Optional[str] = None
+    Cap: Optional[str] = None
+    Citta: Optional[str] = None
+    Prov: Optional[str] = None
+    CodiceFiscale: Optional[str] = None
+    PartitaIva: Optional[str] = None
+    Email: Optional[str] = None
+    sesso: Optional[int] = None
+    VIPanno: Optional[int] = None
+    maps: Optional[str] = None
+    VIPscadenza: Optional[str] = None
+    Blocco: Optional[int] = None
+    cognome: Optional[str] = None
+    SerBlocco: Optional[int] = None
+    SerBloccoBz: Optional[str] = None
+    omail: Optional[bool] = None
+    oposte: Optional[bool] = None
+    msg: Optional[int] = None
+    msgstr: Optional[str] = None
+    utime: Optional[str] = None
+    upc: Optional[str] = None
+    uzt: Optional[int] = None
+    un: Optional[str] = None
+    lotteria: Optional[str] = None
+    statoanno: Optional[str] = None
+    img: Optional[str] = None  # Hex-encoded image bytes
+    n: Optional[str] = None
+    SCOscadenza: Optional[str] = None
+
+    @field_validator("P_importo", mode="before")
+    @classmethod
+    def importo_default(cls, value):
+        # DECIMAL column; NULL is reported as 0.00
+        return 0.00 if value is None else value
+
+    @field_validator("img", mode="before")
+    @classmethod
+    def img_to_hex(cls, value):
+        return value.hex() if value else None
+
+# Columns that can be requested through /api/dashboard?fields=
+VIP_FIELDS = list(VIPOut.model_fields)
+VIP_DEFERRED_GROUPS = ("media", "pos")
+
+class DashboardOut(BaseModel):
+    username: str
+    vip: VIPOut
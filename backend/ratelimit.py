@@ -0,0 +1,158 @@
+# ratelimit.py
+import os
+import time
+from collections import OrderedDict
+from fastapi import HTTPException
+
+# Token buckets for /api/login: sustained attempts per minute and the burst allowed on top
+LOGIN_IP_PER_MINUTE = float(os.getenv("LOGIN_IP_PER_MINUTE", "60"))
+LOGIN_IP_BURST = int(os.getenv("LOGIN_IP_BURST", "30"))
+LOGIN_USER_PER_MINUTE = float(os.getenv("LOGIN_USER_PER_MINUTE", "10"))
+LOGIN_USER_BURST = int(os.getenv("LOGIN_USER_BURST", "10"))
+# "memory" (per worker) or "redis" (shared by every worker, needs the redis package)
+RATE_LIMIT_BACKEND = os.getenv("RATE_LIMIT_BACKEND", "memory")
+RATE_LIMIT_REDIS_URL = os.getenv("RATE_LIMIT_REDIS_URL", "redis://localhost:6379/0")
+# Reverse proxies in front of the app that append to X-Forwarded-For (0 = use the socket peer).
+# Only the entries they added can be trusted; anything further left was sent by the client.
+RATE_LIMIT_TRUSTED_PROXIES = int(os.getenv("RATE_LIMIT_TRUSTED_PROXIES", "0"))
+
+
+def too_many_requests(retry_after: float, detail: str = "Too many login attempts, try again later"):
+    return HTTPException(status_code=429, detail=detail, headers={"Retry-After": str(max(1, int(retry_after + 0.999)))})
+
+
+class MemoryBackend:
+    """Token buckets in a dict, local to this worker process.
+
+    The least recently used buckets are dropped past max_keys; an idle bucket has
+    refilled to full anyway, so dropping it only forgets state that no longer matters.
+    """
+
+    def __init__(self, max_keys: int = 100_000, clock=time.monotonic):
+        self.max_keys = max_keys
+        self.clock = clock
+        self._buckets = OrderedDict()  # key -> (tokens, updated_at)
+
+    async def take(self, key: str, rate: float, burst: int) -> float:
+        """Take one token; return 0 if allowed, else seconds until one is available."""
+        now = self.clock()
+        tokens, updated_at = self._buckets.pop(key, (burst, now))
+        tokens = min(burst, tokens + (now - updated_at) * rate)
+        if tokens >= 1:
+            tokens, wait = tokens - 1, 0.0
+        else:
+            wait = (1 - tokens) / rate
+        self._buckets[key] = (tokens, now)
+        if len(self._buckets) > self.max_keys:
+            self._buckets.popitem(last=False)
+        return wait
+
+    async def reset(self):
+        self._buckets.clear()
+
+
+class FakeBackend(MemoryBackend):
+    """Memory backend on a manual clock, for tests."""
+
+    def __init__(self, max_keys: int = 100_000):
+        self.now = 0.0
+        super().__init__(max_keys, clock=lambda: self.now)
+
+    def advance(self, seconds: float):
+        self.now += seconds
+
+
+class RedisBackend:
+    """Token buckets in Redis, shared by every worker; the update is one atomic script call."""
+
+    SCRIPT = """
+    local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'updated_at')
+    local rate, burst = tonumber(ARGV[1]), tonumber(ARGV[2])
+    local clock = redis.call('TIME')
+    local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+    local tokens = tonumber(bucket[1]) or burst
+    local updated_at = tonumber(bucket[2]) or now
+    tokens = math.min(burst, tokens + (now - updated_at) * rate)
+    local wait = 0
+    if tokens >= 1 then tokens = tokens - 1 else wait = (1 - tokens) / rate end
+    redis.call('HSET', KEYS[1], 'tokens', tokens, 'updated_at', now)
+    redis.call('EXPIRE', KEYS[1], math.ceil(burst / rate) + 1)
+    return tostring(wait)
+    """
+
+    def __init__(self, url: str = RATE_LIMIT_REDIS_URL, prefix: str = "ratelimit:"):
+        try:
+            import redis.asyncio as redis
+        except ImportError as e:
+            raise RuntimeError("RATE_LIMIT_BACKEND=redis needs the redis package") from e
+        self.prefix = prefix
+        self._client = redis.from_url(url)
+        self._script = self._client.register_script(self.SCRIPT)
+
+    async def take(self, key: str, rate: float, burst: int) -> float:
+        return float(await self._script(keys=[self.prefix + key], args=[rate, burst]))
+
+    async def reset(self):
+        async for key in self._client.scan_iter(self.prefix + "*"):
+            await self._client.delete(key)
+
+
+BACKENDS = {"memory": MemoryBackend, "redis": RedisBackend}
+
+
+class LoginLimiter:
+    """Per-IP and per-username token buckets plus a cap on concurrent password checks.
+
+    Buckets slow down credential stuffing from one address and guessing against one
+    account; the concurrency cap sheds a distributed burst or a mass re-login before
+    it queues enough bcrypt work to starve every other endpoint.
+    """
+
+    def __init__(self, backend=None, max_concurrent: int = None):
+        self.backend = backend or BACKENDS[RATE_LIMIT_BACKEND]()
+        self.max_concurrent = max_concurrent
+        self.verifying = 0
+        self.rejected_ip = 0
+        self.rejected_user = 0
+        self.rejected_busy = 0
+
+    async def check(self, ip: str, username: str):
+        wait = await self.backend.take(f"login:ip:{ip}", LOGIN_IP_PER_MINUTE / 60, LOGIN_IP_BURST)
+        if wait:
+            self.rejected_ip += 1
+            raise too_many_requests(wait)
+        wait = await self.backend.take(f"login:user:{username.lower()}", LOGIN_USER_PER_MINUTE / 60, LOGIN_USER_BURST)
+        if wait:
+            self.rejected_user += 1
+            raise too_many_requests(wait)
+
+    def __enter__(self):
+        # Admission for one password verification; full means shed the request now
+        if self.max_concurrent is not None and self.verifying >= self.max_concurrent:
+            self.rejected_busy += 1
+            raise too_many_requests(1, "Server busy, try again later")
+        self.verifying += 1
+        return self
+
+    def __exit__(self, *exc_info):
+        self.verifying -= 1
+
+    def stats(self) -> dict:
+        return {
+            "backend": type(self.backend).__name__,
+            "verifying": self.verifying,
+            "max_concurrent": self.max_concurrent,
+            "rejected_ip": self.rejected_ip,
+            "rejected_user": self.rejected_user,
+            "rejected_busy": self.rejected_busy,
+        }
+
+
+def client_ip(request, trusted_proxies: int = None) -> str:
+    # Each proxy appends the address it received the request from, so with N proxies
+    # the client is N entries from the right; a forged leftmost entry is ignored
+    trusted_proxies = RATE_LIMIT_TRUSTED_PROXIES if trusted_proxies is None else trusted_proxies
+    forwarded = [ip.strip() for ip in request.headers.get("x-forwarded-for", "").split(",") if ip.strip()]
+    if trusted_proxies and forwarded:
+        return forwarded[-min(trusted_proxies, len(forwarded))]
+    return request.client.host if request.client else "unknown"
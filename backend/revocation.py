@@ -0,0 +1,198 @@
+# revocation.py
+import asyncio
+import hashlib
+import logging
+import os
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import delete, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from models import BlacklistedToken, RefreshToken, User
+
+logger = logging.getLogger(__name__)
+
+# Upper bound on how long a token revoked through another worker can still be
+# accepted here: each worker pulls new blacklist rows at most this often.
+REVOCATION_REFRESH_SECONDS = float(os.getenv("REVOCATION_REFRESH_SECONDS", "5"))
+# Ids are assigned at INSERT but become visible at COMMIT, so a row with a lower id than
+# one already loaded can still show up; every refresh re-reads rows this recent as well.
+REVOCATION_LOOKBACK_SECONDS = float(os.getenv("REVOCATION_LOOKBACK_SECONDS", "60"))
+REVOCATION_PURGE_SECONDS = float(os.getenv("REVOCATION_PURGE_SECONDS", "300"))
+REVOCATION_BLOOM_BITS = int(os.getenv("REVOCATION_BLOOM_BITS", str(1 << 20)))
+REVOCATION_BLOOM_HASHES = 4
+# Same bound for "log out all devices" done through another worker
+TOKEN_VERSION_REFRESH_SECONDS = float(os.getenv("TOKEN_VERSION_REFRESH_SECONDS", str(REVOCATION_REFRESH_SECONDS)))
+TOKEN_VERSION_CACHE_SIZE = int(os.getenv("TOKEN_VERSION_CACHE_SIZE", "100000"))
+
+
+def token_digest(value: str) -> str:
+    return hashlib.sha256(value.encode()).hexdigest()
+
+def revocation_digest(token: str, payload: dict) -> str:
+    # Tokens issued before jti existed are keyed by the whole token instead
+    return token_digest(payload.get("jti") or token)
+
+def expiry_of(payload: dict) -> datetime:
+    # Naive UTC, like the other DateTime columns
+    return datetime.fromtimestamp(payload["exp"], timezone.utc).replace(tzinfo=None)
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over hex digests; bit positions are slices of the digest."""
+
+    def __init__(self, bits: int = REVOCATION_BLOOM_BITS, hashes: int = REVOCATION_BLOOM_HASHES):
+        self.bits = bits
+        self.hashes = hashes
+        self._array = bytearray((bits + 7) // 8)
+
+    def _positions(self, digest: str):
+        for i in range(self.hashes):
+            yield int(digest[i * 8:(i + 1) * 8], 16) % self.bits
+
+    def add(self, digest: str):
+        for pos in self._positions(digest):
+            self._array[pos >> 3] |= 1 << (pos & 7)
+
+    def __contains__(self, digest: str) -> bool:
+        return all(self._array[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(digest))
+
+
+class RevocationCache:
+    """Process-local copy of the blacklisted_tokens table.
+
+    Lookups never touch the database: the Bloom filter answers "definitely not
+    revoked" for almost every live token and the digest map confirms the rest.
+    Logouts in this worker are added immediately; rows written by other workers
+    are picked up by refresh(), which loads rows past the last seen id plus any
+    blacklisted within the lookback window, in case they committed out of id order.
+    """
+
+    def __init__(self, refresh_seconds: float = REVOCATION_REFRESH_SECONDS, lookback_seconds: float = REVOCATION_LOOKBACK_SECONDS):
+        self.refresh_seconds = refresh_seconds
+        self.lookback_seconds = lookback_seconds
+        self._bloom = BloomFilter()
+        self._digests = {}  # digest -> expires_at
+        self._last_id = 0
+        self._loaded_at = None  # Wall clock (naive UTC) of the last refresh, for the lookback window
+        self._refreshed_at = None
+        self.bloom_negatives = 0
+        self.set_lookups = 0
+
+    def add(self, digest: str, expires_at: datetime):
+        self._bloom.add(digest)
+        self._digests[digest] = expires_at
+
+    def is_revoked(self, digest: str) -> bool:
+        if digest not in self._bloom:
+            self.bloom_negatives += 1
+            return False
+        self.set_lookups += 1
+        return digest in self._digests
+
+    def is_stale(self) -> bool:
+        return self._refreshed_at is None or time.monotonic() - self._refreshed_at >= self.refresh_seconds
+
+    async def refresh(self, db: AsyncSession):
+        # Mark as fresh up front so concurrent requests don't all issue the same query
+        self._refreshed_at = time.monotonic()
+        loaded_at = datetime.now(timezone.utc).replace(tzinfo=None)
+        query = select(BlacklistedToken.id, BlacklistedToken.digest, BlacklistedToken.expires_at)
+        if self._loaded_at is not None:
+            since = self._loaded_at - timedelta(seconds=self.lookback_seconds)
+            query = query.where(or_(BlacklistedToken.id > self._last_id, BlacklistedToken.blacklisted_at >= since))
+        for row_id, digest, expires_at in await db.execute(query):
+            self.add(digest, expires_at)
+            self._last_id = max(self._last_id, row_id)
+        self._loaded_at = loaded_at
+
+    def purge_expired(self, now: datetime):
+        # Expired tokens fail signature checks anyway; rebuild the filter without them
+        self._digests = {d: exp for d, exp in self._digests.items() if exp >= now}
+        self._bloom = BloomFilter(self._bloom.bits, self._bloom.hashes)
+        for digest in self._digests:
+            self._bloom.add(digest)
+
+    def reset(self):
+        self.__init__(self.refresh_seconds, self.lookback_seconds)
+
+    def stats(self) -> dict:
+        return {
+            "revoked": len(self._digests),
+            "last_id": self._last_id,
+            "refresh_seconds": self.refresh_seconds,
+            "lookback_seconds": self.lookback_seconds,
+            "bloom_negatives": self.bloom_negatives,
+            "set_lookups": self.set_lookups,
+        }
+
+
+revocation_cache = RevocationCache()
+
+
+class TokenVersionCache:
+    """Recently seen users.token_version values, so checking the "ver" claim rarely costs a query."""
+
+    def __init__(self, refresh_seconds: float = TOKEN_VERSION_REFRESH_SECONDS, max_users: int = TOKEN_VERSION_CACHE_SIZE):
+        self.refresh_seconds = refresh_seconds
+        self.max_users = max_users
+        self._versions = OrderedDict()  # user id -> (token_version, fetched_at)
+        self.hits = 0
+        self.misses = 0
+
+    async def get(self, db: AsyncSession, user_id: int):
+        """The user's current token_version, or None if the user no longer exists."""
+        entry = self._versions.get(user_id)
+        if entry is not None and time.monotonic() - entry[1] < self.refresh_seconds:
+            self.hits += 1
+            self._versions.move_to_end(user_id)
+            return entry[0]
+        self.misses += 1
+        version = await db.scalar(select(User.token_version).where(User.id == user_id))
+        self.set(user_id, version)
+        return version
+
+    def set(self, user_id: int, version):
+        self._versions[user_id] = (version, time.monotonic())
+        self._versions.move_to_end(user_id)
+        if len(self._versions) > self.max_users:
+            self._versions.popitem(last=False)
+
+    def invalidate(self, user_id: int):
+        self._versions.pop(user_id, None)
+
+    def reset(self):
+        self.__init__(self.refresh_seconds, self.max_users)
+
+    def stats(self) -> dict:
+        return {"users": len(self._versions), "hits": self.hits, "misses": self.misses, "refresh_seconds": self.refresh_seconds}
+
+
+token_versions = TokenVersionCache()
+
+
+async def purge_expired_tokens(db: AsyncSession) -> int:
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    result = await db.execute(delete(BlacklistedToken).where(BlacklistedToken.expires_at < now))
+    await db.commit()
+    revocation_cache.purge_expired(now)
+    return result.rowcount
+
+async def purge_expired_refresh_tokens(db: AsyncSession) -> int:
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    result = await db.execute(delete(RefreshToken).where(RefreshToken.expires_at < now))
+    await db.commit()
+    return result.rowcount
+
+async def run_purge_loop(session_factory, interval: float = REVOCATION_PURGE_SECONDS):
+    # Keeps blacklisted_tokens at roughly (logouts per token lifetime) rows
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            async with session_factory() as db:
+                purged = await purge_expired_tokens(db)
+                purged_refresh = await purge_expired_refresh_tokens(db)
+            if purged or purged_refresh:
+                logger.info("Purged %d expired blacklisted tokens and %d refresh tokens", purged, purged_refresh)
+        except Exception:
+            logger.exception("Blacklist purge failed")
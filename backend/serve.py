@@ -0,0 +1,180 @@
+# serve.py
+# Production server: N worker processes running main:app on uvloop + httptools.
+#
+#   uv run python serve.py                       # one worker per core
+#   uv run python serve.py --workers 4 --port 8000
+#   uv run python serve.py --server gunicorn     # preloaded app, needs the gunicorn extra
+#
+# Every setting can also come from .env (see .env.template). Use `fastapi dev main.py`
+# for development; it reloads on changes but runs a single worker.
+#
+# With gunicorn the app is imported once in the master and the workers are forked
+# from it, so the imported modules and the startup work are shared copy-on-write.
+# Uvicorn's own supervisor spawns fresh interpreters, so each worker imports the app.
+import argparse
+import gc
+import importlib.util
+import logging
+import os
+import sys
+
+from dotenv import load_dotenv
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+load_dotenv(os.path.join(BACKEND_DIR, ".env"))
+
+SERVER_KIND = os.getenv("SERVER_KIND", "auto")  # auto (gunicorn if installed), uvicorn or gunicorn
+WEB_CONCURRENCY = int(os.getenv("WEB_CONCURRENCY", "0"))  # worker processes; 0 means one per core
+SERVER_HOST = os.getenv("SERVER_HOST", "127.0.0.1")
+SERVER_PORT = int(os.getenv("SERVER_PORT", "8000"))
+SERVER_LOOP = os.getenv("SERVER_LOOP", "uvloop")
+SERVER_HTTP = os.getenv("SERVER_HTTP", "httptools")
+# Keep idle connections open longer than the load balancer does, or it reuses ones we just closed (502s)
+SERVER_KEEPALIVE_SECONDS = int(os.getenv("SERVER_KEEPALIVE_SECONDS", "5"))
+# On SIGTERM workers stop accepting and finish in-flight requests for up to this long
+SERVER_GRACEFUL_TIMEOUT_SECONDS = int(os.getenv("SERVER_GRACEFUL_TIMEOUT_SECONDS", "30"))
+SERVER_BACKLOG = int(os.getenv("SERVER_BACKLOG", "2048"))
+# Restart a worker after this many requests (plus up to the jitter), 0 to never restart
+SERVER_MAX_REQUESTS = int(os.getenv("SERVER_MAX_REQUESTS", "0"))
+SERVER_MAX_REQUESTS_JITTER = int(os.getenv("SERVER_MAX_REQUESTS_JITTER", "0"))
+SERVER_ACCESS_LOG = os.getenv("SERVER_ACCESS_LOG", "true").lower() in ("1", "true", "yes")
+
+log = logging.getLogger("serve")
+
+
+def installed(module: str) -> bool:
+    return importlib.util.find_spec(module) is not None
+
+
+def pick(wanted: str, fallback: str) -> str:
+    # uvloop and httptools come with fastapi[standard]; without them (e.g. Windows) fall back
+    if wanted in ("uvloop", "httptools") and not installed(wanted):
+        log.warning("%s is not installed, using %s", wanted, fallback)
+        return fallback
+    return wanted
+
+
+def share_cores(workers: int):
+    # Each worker sizes its password hash pool by os.cpu_count(); split the cores between them
+    # instead, so N workers don't run N bcrypts per core. An explicit setting wins.
+    if not os.getenv("HASH_POOL_WORKERS"):
+        os.environ["HASH_POOL_WORKERS"] = str(max(1, (os.cpu_count() or 1) // workers))
+
+
+def create_schema():
+    # main.py runs create_all at import; workers importing it at the same moment race to
+    # create the same tables on a fresh database, so create them once before starting any
+    import models  # noqa: F401  (registers the tables)
+    from database import Base, engine
+    Base.metadata.create_all(bind=engine)
+    engine.dispose()
+
+
+def describe(args):
+    from database import DB_MAX_OVERFLOW, DB_POOL_SIZE
+    log.warning(
+        "%s: %d workers on %s:%d (loop=%s, http=%s, keep-alive %ds); up to %d database connections",
+        args.server, args.workers, args.host, args.port, args.loop, args.http, args.keepalive,
+        args.workers * (DB_POOL_SIZE + DB_MAX_OVERFLOW),
+    )
+
+
+def run_uvicorn(args):
+    import uvicorn
+    uvicorn.run(
+        "main:app",
+        app_dir=BACKEND_DIR,
+        host=args.host,
+        port=args.port,
+        workers=args.workers,
+        loop=args.loop,
+        http=args.http,
+        backlog=args.backlog,
+        timeout_keep_alive=args.keepalive,
+        timeout_graceful_shutdown=args.graceful_timeout,
+        limit_max_requests=args.max_requests or None,
+        limit_max_requests_jitter=args.max_requests_jitter,
+        access_log=args.access_log,
+    )
+
+
+def run_gunicorn(args):
+    from gunicorn.app.base import BaseApplication
+    from uvicorn_worker import UvicornWorker
+
+    class Worker(UvicornWorker):
+        CONFIG_KWARGS = {"loop": args.loop, "http": args.http}
+
+    def post_fork(server, worker):
+        # Connections opened while preloading (create_all) belong to the master; forked
+        # workers must not share its sockets, so each one starts with empty pools
+        from database import async_engine, engine, replica_engines
+        for e in (engine, async_engine.sync_engine, *(r.sync_engine for r in replica_engines)):
+            e.dispose(close=False)
+
+    class Server(BaseApplication):
+        def load_config(self):
+            settings = {
+                "bind": f"{args.host}:{args.port}",
+                "workers": args.workers,
+                "worker_class": Worker,
+                "preload_app": True,
+                "backlog": args.backlog,
+                "keepalive": args.keepalive,
+                "graceful_timeout": args.graceful_timeout,
+                "max_requests": args.max_requests,
+                "max_requests_jitter": args.max_requests_jitter,
+                "accesslog": "-" if args.access_log else None,
+                "post_fork": post_fork,
+            }
+            for key, value in settings.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            sys.path.insert(0, BACKEND_DIR)
+            from main import app
+            # Move everything imported so far out of the collector's reach; otherwise the
+            # workers' GC passes write to those pages and undo the copy-on-write sharing
+            gc.freeze()
+            return app
+
+    Server().run()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the membership API with several worker processes")
+    parser.add_argument("--server", choices=("auto", "uvicorn", "gunicorn"), default=SERVER_KIND)
+    parser.add_argument("--workers", type=int, default=WEB_CONCURRENCY, help="Worker processes (default: one per core)")
+    parser.add_argument("--host", default=SERVER_HOST)
+    parser.add_argument("--port", type=int, default=SERVER_PORT)
+    parser.add_argument("--loop", default=SERVER_LOOP, help="uvloop, asyncio or auto")
+    parser.add_argument("--http", default=SERVER_HTTP, help="httptools, h11 or auto")
+    parser.add_argument("--keepalive", type=int, default=SERVER_KEEPALIVE_SECONDS, help="Idle keep-alive seconds")
+    parser.add_argument("--graceful-timeout", type=int, default=SERVER_GRACEFUL_TIMEOUT_SECONDS)
+    parser.add_argument("--backlog", type=int, default=SERVER_BACKLOG)
+    parser.add_argument("--max-requests", type=int, default=SERVER_MAX_REQUESTS)
+    parser.add_argument("--max-requests-jitter", type=int, default=SERVER_MAX_REQUESTS_JITTER)
+    parser.add_argument("--no-access-log", dest="access_log", action="store_false", default=SERVER_ACCESS_LOG)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(format="%(levelname)s:     %(message)s")
+    args.workers = args.workers or os.cpu_count() or 1
+    args.loop = pick(args.loop, "asyncio")
+    args.http = pick(args.http, "h11")
+    if args.server == "auto":
+        args.server = "gunicorn" if installed("gunicorn") and installed("uvicorn_worker") else "uvicorn"
+    if args.server == "gunicorn" and not installed("uvicorn_worker"):
+        parser.error("--server gunicorn needs the gunicorn extra (gunicorn and uvicorn-worker)")
+
+    share_cores(args.workers)
+    sys.path.insert(0, BACKEND_DIR)
+    create_schema()
+    describe(args)
+    if args.server == "gunicorn":
+        run_gunicorn(args)
+    else:
+        run_uvicorn(args)
+
+
+if __name__ == "__main__":
+    main()
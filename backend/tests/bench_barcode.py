@@ -0,0 +1,37 @@
+# bench_barcode.py
+# Compares PNG (python-barcode + Pillow) against native SVG barcode rendering:
+# per-render latency and payload size, without the cache.
+#
+#   uv run python tests/bench_barcode.py --iterations 200
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import argparse
+import statistics
+import time
+
+from barcodes import render_barcode, WRITER_OPTIONS
+
+
+def bench(name: str, options: dict, codes: list):
+    timings = []
+    sizes = []
+    for code in codes:
+        start = time.perf_counter()
+        data = render_barcode(code, options)
+        timings.append(time.perf_counter() - start)
+        sizes.append(len(data))
+    timings.sort()
+    p99 = timings[min(len(timings) - 1, int(len(timings) * 0.99))]
+    print(f"{name}: mean={statistics.mean(timings) * 1000:.3f} ms  p99={p99 * 1000:.3f} ms  "
+          f"size={statistics.mean(sizes):.0f} bytes")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="PNG vs SVG barcode rendering benchmark")
+    parser.add_argument("--iterations", type=int, default=200)
+    args = parser.parse_args()
+    codes = [f"VIP{i:010d}" for i in range(args.iterations)]
+    bench("png", WRITER_OPTIONS, codes)
+    bench("svg", {"format": "SVG"}, codes)
@@ -0,0 +1,69 @@
+# bench_concurrency.py
+# Measures requests/sec of /api/dashboard under N concurrent clients against a
+# running backend. Run it once against the old build and once against the new
+# one to compare, e.g.:
+#
+#   uv run uvicorn main:app --port 8000
+#   uv run python tests/bench_concurrency.py --url http://127.0.0.1:8000 --clients 50
+import argparse
+import asyncio
+import time
+import uuid
+
+import httpx
+
+
+async def seed_user(client: httpx.AsyncClient) -> str:
+    username = f"bench-{uuid.uuid4().hex[:12]}"
+    password = "bench123"
+    payload = {"user": {"username": username, "password": password}, "vip": {"code": "BENCH00000001", "Nome": "Bench"}}
+    response = await client.post("/signup/", json=payload)
+    response.raise_for_status()
+    response = await client.post("/api/login", data={"username": username, "password": password})
+    response.raise_for_status()
+    return response.json()["access_token"]
+
+
+async def worker(client: httpx.AsyncClient, path: str, token: str, deadline: float, latencies: list, errors: list):
+    headers = {"Authorization": f"Bearer {token}"}
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        try:
+            response = await client.get(path, headers=headers)
+            if response.status_code != 200:
+                errors.append(response.status_code)
+                continue
+        except httpx.HTTPError as e:
+            errors.append(type(e).__name__)
+            continue
+        latencies.append(time.perf_counter() - start)
+
+
+async def run(url: str, path: str, clients: int, duration: float):
+    limits = httpx.Limits(max_connections=clients, max_keepalive_connections=clients)
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=30) as client:
+        token = await seed_user(client)
+        latencies, errors = [], []
+        deadline = time.perf_counter() + duration
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(client, path, token, deadline, latencies, errors) for _ in range(clients)))
+        elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    def pct(p):
+        return latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000 if latencies else 0.0
+
+    print(f"{path}: {clients} clients, {elapsed:.1f}s")
+    print(f"  requests: {len(latencies)}  errors: {len(errors)}")
+    print(f"  throughput: {len(latencies) / elapsed:.1f} req/s")
+    print(f"  latency ms: p50={pct(0.50):.1f} p95={pct(0.95):.1f} p99={pct(0.99):.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Concurrent load benchmark for the membership API")
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--path", default="/api/dashboard")
+    parser.add_argument("--clients", type=int, default=50)
+    parser.add_argument("--duration", type=float, default=10.0)
+    args = parser.parse_args()
+    asyncio.run(run(args.url, args.path, args.clients, args.duration))
@@ -0,0 +1,291 @@
+# bench_load.py
+# Mixed-workload load test: seeds N members, then drives login storms, dashboard
+# polling, barcode scans and signup bursts concurrently and reports throughput and
+# p50/p95/p99 latency per endpoint. Results are saved as JSON so a release can be
+# compared with the previous one.
+#
+# Offline, in-process against a fresh SQLite file (no server needed):
+#   uv run python tests/bench_load.py --members 2000 --duration 30 --output bench-results/current.json
+#
+# Against a running server and its database (e.g. a local MySQL container):
+#   uv run python tests/bench_load.py --url http://127.0.0.1:8000 \
+#       --database-url mysql+pymysql://user:pw@127.0.0.1/membership --compare bench-results/previous.json
+#
+# Every virtual client shares this machine's IP, so the server's per-IP login limit
+# applies to the whole run. In-process runs lift it; a target server has to be started
+# with LOGIN_IP_PER_MINUTE and LOGIN_IP_BURST well above the login rate of the mix
+# (e.g. 1000000 each), or its login numbers are mostly 429s. Session logins before the
+# run wait out any 429 instead of failing.
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter, defaultdict
+from contextlib import AsyncExitStack
+from datetime import datetime, timezone
+
+import httpx
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.append(BACKEND_DIR)
+
+PASSWORD = "bench123"
+DEFAULT_MIX = "login=1,dashboard=6,barcode=3,signup=0.2"
+
+
+def parse_mix(text: str) -> dict:
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        if name.strip() not in SCENARIOS:
+            raise argparse.ArgumentTypeError(f"Unknown scenario {name!r}; choose from {', '.join(SCENARIOS)}")
+        mix[name.strip()] = float(weight or 1)
+    return mix
+
+def percentile(sorted_values: list, p: float) -> float:
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * p))]
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def seed_members(database_url: str, count: int, prefix: str) -> list:
+    """Insert `count` members straight into the database; reruns reuse existing ones."""
+    from sqlalchemy import create_engine
+    from auth import hash_password
+    from import_members import MemberImporter
+
+    # Every seeded member shares one hash, so seeding costs a single bcrypt call
+    password_hash = hash_password(PASSWORD)
+    usernames = [f"{prefix}{i:07d}" for i in range(count)]
+    records = (
+        {"username": username, "password_hash": password_hash,
+         "vip": {"code": f"LD{i:011d}", "Nome": "Load", "cognome": "Test", "Punti": i % 1000, "inegozio": i % 20}}
+        for i, username in enumerate(usernames)
+    )
+    engine = create_engine(database_url)
+    try:
+        MemberImporter(engine=engine, chunk_size=1000, log=lambda *_: None).run(enumerate(records, 1))
+    finally:
+        engine.dispose()
+    return usernames
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies = defaultdict(list)  # scenario -> seconds
+        self.errors = defaultdict(Counter)  # scenario -> status code or exception name
+        self.recording = False
+
+    def record(self, scenario: str, seconds: float, error=None):
+        if not self.recording:
+            return  # Warm-up
+        if error is None:
+            self.latencies[scenario].append(seconds)
+        else:
+            self.errors[scenario][str(error)] += 1
+
+    def summary(self, elapsed: float) -> dict:
+        endpoints = {}
+        for scenario in sorted(set(self.latencies) | set(self.errors)):
+            values = sorted(self.latencies[scenario])
+            endpoints[scenario] = {
+                "requests": len(values),
+                "errors": dict(self.errors[scenario]),
+                "throughput": round(len(values) / elapsed, 2),
+                "mean_ms": round(sum(values) / len(values) * 1000, 2) if values else 0.0,
+                "p50_ms": round(percentile(values, 0.50) * 1000, 2),
+                "p95_ms": round(percentile(values, 0.95) * 1000, 2),
+                "p99_ms": round(percentile(values, 0.99) * 1000, 2),
+            }
+        return endpoints
+
+
+class Workload:
+    """Shared state for the virtual clients: seeded members, session tokens and counters."""
+
+    def __init__(self, client: httpx.AsyncClient, usernames: list, tokens: list, recorder: Recorder, prefix: str):
+        self.client = client
+        self.usernames = usernames
+        self.tokens = tokens
+        self.recorder = recorder
+        self.prefix = prefix
+        self.signups = 0
+
+    async def call(self, scenario: str, method: str, path: str, expected=(200,), **kwargs):
+        start = time.perf_counter()
+        try:
+            response = await self.client.request(method, path, **kwargs)
+        except httpx.HTTPError as e:
+            self.recorder.record(scenario, 0.0, type(e).__name__)
+            return None
+        elapsed = time.perf_counter() - start
+        self.recorder.record(scenario, elapsed, None if response.status_code in expected else response.status_code)
+        return response
+
+    async def login(self, rng: random.Random):
+        username = rng.choice(self.usernames)
+        await self.call("login", "POST", "/api/login", data={"username": username, "password": PASSWORD})
+
+    async def dashboard(self, rng: random.Random):
+        headers = {"Authorization": f"Bearer {rng.choice(self.tokens)}"}
+        await self.call("dashboard", "GET", "/api/dashboard", headers=headers)
+
+    async def barcode(self, rng: random.Random):
+        headers = {"Authorization": f"Bearer {rng.choice(self.tokens)}"}
+        await self.call("barcode", "GET", "/api/barcode", headers=headers)
+
+    async def signup(self, rng: random.Random):
+        self.signups += 1
+        username = f"{self.prefix}s{os.getpid()}-{time.time_ns()}-{self.signups}"
+        payload = {"user": {"username": username, "password": PASSWORD}, "vip": {"code": "LDSIGNUP00001", "Nome": "Load"}}
+        await self.call("signup", "POST", "/signup/", json=payload)
+
+
+SCENARIOS = ("login", "dashboard", "barcode", "signup")
+
+
+async def virtual_client(workload: Workload, mix: dict, seed: int, deadline: float):
+    rng = random.Random(seed)
+    names, weights = list(mix), list(mix.values())
+    while time.perf_counter() < deadline:
+        scenario = rng.choices(names, weights)[0]
+        await getattr(workload, scenario)(rng)
+
+
+async def open_client(stack: AsyncExitStack, args) -> httpx.AsyncClient:
+    limits = httpx.Limits(max_connections=args.clients, max_keepalive_connections=args.clients)
+    if args.url:
+        return await stack.enter_async_context(httpx.AsyncClient(base_url=args.url, limits=limits, timeout=60))
+    # In-process: the app runs on this event loop, including its startup and shutdown
+    from main import app
+    await stack.enter_async_context(app.router.lifespan_context(app))
+    transport = httpx.ASGITransport(app=app)
+    return await stack.enter_async_context(httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60))
+
+
+async def open_session(client: httpx.AsyncClient, username: str) -> str:
+    # Logins past the server's per-IP burst get 429; wait as told rather than abort the run
+    while True:
+        response = await client.post("/api/login", data={"username": username, "password": PASSWORD})
+        if response.status_code != 429:
+            response.raise_for_status()
+            return response.json()["access_token"]
+        await asyncio.sleep(float(response.headers.get("retry-after", "1")))
+
+
+async def run(args) -> dict:
+    usernames = seed_members(args.database_url, args.members, args.prefix)
+    recorder = Recorder()
+    async with AsyncExitStack() as stack:
+        client = await open_client(stack, args)
+        # A fixed set of sessions, like members keeping the app open
+        rng = random.Random(args.seed)
+        tokens = [await open_session(client, username) for username in rng.sample(usernames, min(args.sessions, len(usernames)))]
+
+        workload = Workload(client, usernames, tokens, recorder, args.prefix)
+        deadline = time.perf_counter() + args.warmup + args.duration
+        clients = [
+            asyncio.create_task(virtual_client(workload, args.mix, args.seed * 1000 + i, deadline))
+            for i in range(args.clients)
+        ]
+        await asyncio.sleep(args.warmup)
+        recorder.recording = True
+        started = time.perf_counter()
+        await asyncio.gather(*clients)
+        elapsed = time.perf_counter() - started
+
+    endpoints = recorder.summary(elapsed)
+    total_requests = sum(e["requests"] for e in endpoints.values())
+    return {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "commit": git_commit(),
+            "target": args.url or "in-process",
+            "database": args.database_url.split("://")[0],
+            "members": args.members,
+            "sessions": len(tokens),
+            "clients": args.clients,
+            "duration": round(elapsed, 2),
+            "mix": args.mix,
+            "seed": args.seed,
+            "python": platform.python_version(),
+            "cpus": os.cpu_count(),
+        },
+        "total": {
+            "requests": total_requests,
+            "errors": sum(sum(e["errors"].values()) for e in endpoints.values()),
+            "throughput": round(total_requests / elapsed, 2),
+        },
+        "endpoints": endpoints,
+    }
+
+
+def print_report(results: dict, previous: dict = None):
+    meta = results["meta"]
+    print(f"{meta['target']} ({meta['database']}), {meta['clients']} clients, {meta['duration']}s, commit {meta['commit']}")
+    print(f"{'endpoint':<10} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'errors':>7}")
+    for name, e in results["endpoints"].items():
+        line = f"{name:<10} {e['throughput']:>9.1f} {e['p50_ms']:>9.1f} {e['p95_ms']:>9.1f} {e['p99_ms']:>9.1f} {sum(e['errors'].values()):>7}"
+        before = (previous or {}).get("endpoints", {}).get(name)
+        if before and before["throughput"] and before["p95_ms"]:
+            line += (f"   vs {previous['meta']['commit']}: req/s {e['throughput'] / before['throughput'] - 1:+.0%},"
+                     f" p95 {e['p95_ms'] / before['p95_ms'] - 1:+.0%}")
+        print(line)
+    total = results["total"]
+    print(f"{'total':<10} {total['throughput']:>9.1f} {'':>29} {total['errors']:>7}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Mixed-workload load test for the membership API")
+    parser.add_argument("--url", default=None, help="Running server; omit to run the app in-process")
+    parser.add_argument("--database-url", default=None,
+                        help="Database to seed (the server's, with --url); default: a fresh SQLite file")
+    parser.add_argument("--members", type=int, default=1000, help="Members to seed")
+    parser.add_argument("--sessions", type=int, default=50, help="Logged-in members used for dashboard/barcode")
+    parser.add_argument("--clients", type=int, default=20, help="Concurrent virtual clients")
+    parser.add_argument("--duration", type=float, default=20.0, help="Measured seconds")
+    parser.add_argument("--warmup", type=float, default=2.0, help="Unmeasured seconds before the run")
+    parser.add_argument("--mix", type=parse_mix, default=DEFAULT_MIX, help=f"Scenario weights (default: {DEFAULT_MIX})")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--prefix", default="load-", help="Username prefix of seeded members")
+    parser.add_argument("--output", default=None, help="Write results to this JSON file")
+    parser.add_argument("--compare", default=None, help="Previous results JSON to compare against")
+    args = parser.parse_args()
+    if isinstance(args.mix, str):
+        args.mix = parse_mix(args.mix)
+
+    if args.database_url is None:
+        if args.url:
+            parser.error("--database-url is required with --url so members can be seeded")
+        args.database_url = f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='bench-'), 'bench.db')}"
+    if not args.url:
+        # Must be set before the app's modules create their engines
+        os.environ["DATABASE_URL"] = args.database_url
+        os.environ.pop("ASYNC_DATABASE_URL", None)
+        # Every virtual client shares one IP; keep the per-IP login limit out of the measurement
+        os.environ.setdefault("LOGIN_IP_PER_MINUTE", "1000000")
+        os.environ.setdefault("LOGIN_IP_BURST", "1000000")
+
+    results = asyncio.run(run(args))
+    previous = None
+    if args.compare:
+        with open(args.compare) as f:
+            previous = json.load(f)
+    print_report(results, previous)
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
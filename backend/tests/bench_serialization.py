@@ -0,0 +1,66 @@
+# bench_serialization.py
+# Microbenchmark of /api/dashboard serialization: the old hand-built dict passed
+# through jsonable_encoder + json.dumps, against the DashboardOut model built
+# from the ORM row and dumped to JSON by pydantic-core.
+#
+#   uv run python tests/bench_serialization.py --iterations 20000
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import argparse
+import decimal
+import json
+import time
+from datetime import datetime
+
+from fastapi.encoders import jsonable_encoder
+from models import VIPTable, VIPOut, DashboardOut
+
+COLUMNS = [c.name for c in VIPTable.__table__.columns]
+
+
+def make_vip() -> VIPTable:
+    return VIPTable(
+        IDvip=42, code="VIP0000000042", nascita="1980-01-01", cellulare="+39 333 1234567", sms=True,
+        Punti=420, Sconto=10, Ck="x", idata=datetime(2025, 3, 20, 10, 0, 0), ioperatore=1, inegozio=3,
+        P_cs=0, P_ldata="2025-03-01", P_importo=decimal.Decimal("12.50"), Nome="Mario", Indirizzo="Via Roma 1",
+        Cap="00100", Citta="Roma", Prov="RM", CodiceFiscale="RSSMRA80A01H501U", PartitaIva="", Email="m@example.com",
+        sesso=0, VIPanno=2025, maps="", VIPscadenza="2026-01-01", Blocco=0, cognome="Rossi", SerBlocco=0,
+        SerBloccoBz="", omail=False, oposte=False, msg=0, msgstr="", utime="", upc="", uzt=0, un="",
+        lotteria="", statoanno="", img=None, n="", SCOscadenza="",
+    )
+
+
+def legacy(vip: VIPTable) -> bytes:
+    # Equivalent of the previous handler: copy columns by hand, then FastAPI's encoder
+    data = {name: getattr(vip, name) for name in COLUMNS}
+    data["idata"] = vip.idata.isoformat() if vip.idata else None
+    data["P_importo"] = float(vip.P_importo) if vip.P_importo is not None else 0.00
+    data["img"] = vip.img.hex() if vip.img else None
+    content = jsonable_encoder({"username": "member", "vip": data})
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode()
+
+
+def typed(vip: VIPTable) -> bytes:
+    return DashboardOut(username="member", vip=VIPOut.model_validate(vip)).model_dump_json().encode()
+
+
+def bench(name: str, fn, vip: VIPTable, iterations: int) -> float:
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn(vip)
+    per_call = (time.perf_counter() - start) / iterations
+    print(f"{name}: {per_call * 1e6:.1f} us/request")
+    return per_call
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Dashboard serialization microbenchmark")
+    parser.add_argument("--iterations", type=int, default=20000)
+    args = parser.parse_args()
+    vip = make_vip()
+    assert json.loads(legacy(vip)) == json.loads(typed(vip))
+    old = bench("legacy dict + jsonable_encoder", legacy, vip, args.iterations)
+    new = bench("DashboardOut.model_dump_json", typed, vip, args.iterations)
+    print(f"speedup: {old / new:.1f}x")
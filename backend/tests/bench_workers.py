@@ -0,0 +1,115 @@
+# bench_workers.py
+# How /api/dashboard throughput scales with worker processes: starts serve.py with
+# 1, 2, 4, ... workers against the same seeded database, drives dashboard requests
+# with bench_load.py's virtual clients and reports req/s and p95 per worker count.
+#
+#   uv run python tests/bench_workers.py --workers 1,2,4,8 --duration 20 --output bench-results/workers.json
+#
+# The load generator is a single process on the same machine, so pin it away from
+# the server (e.g. `taskset -c 0 ...`) or point a copy of it at another host; once
+# it saturates its own core, more server workers stop showing up in the numbers.
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import argparse
+import asyncio
+import json
+import signal
+import subprocess
+import tempfile
+import time
+
+import httpx
+
+import bench_load
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+
+def default_worker_counts() -> str:
+    counts, n = [], 1
+    while n < (os.cpu_count() or 1):
+        counts.append(n)
+        n *= 2
+    return ",".join(map(str, counts + [os.cpu_count() or 1]))
+
+
+def start_server(args, workers: int) -> subprocess.Popen:
+    # All the sessions log in from this one IP, so lift the per-IP login limit
+    env = dict(os.environ, DATABASE_URL=args.database_url, LOGIN_IP_PER_MINUTE="1000000", LOGIN_IP_BURST="1000000")
+    env.pop("ASYNC_DATABASE_URL", None)
+    server = subprocess.Popen(
+        [sys.executable, os.path.join(BACKEND_DIR, "serve.py"), "--server", args.server, "--workers", str(workers),
+         "--port", str(args.port), "--no-access-log"],
+        cwd=BACKEND_DIR, env=env,
+    )
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        try:
+            httpx.get(f"http://127.0.0.1:{args.port}/metrics").raise_for_status()
+            time.sleep(1)  # Let the remaining workers finish their startup
+            return server
+        except httpx.HTTPError:
+            if server.poll() is not None:
+                raise SystemExit(f"serve.py exited with {server.returncode}")
+            time.sleep(0.2)
+    stop_server(server)
+    raise SystemExit("serve.py did not start within 60s")
+
+
+def stop_server(server: subprocess.Popen):
+    # SIGTERM is the graceful path: in-flight requests finish, then the lifespan shutdown runs
+    server.send_signal(signal.SIGTERM)
+    try:
+        server.wait(timeout=60)
+    except subprocess.TimeoutExpired:
+        server.kill()
+
+
+def measure(args, workers: int) -> dict:
+    server = start_server(args, workers)
+    try:
+        load_args = argparse.Namespace(
+            url=f"http://127.0.0.1:{args.port}", database_url=args.database_url, members=args.members,
+            sessions=args.sessions, clients=args.clients, duration=args.duration, warmup=args.warmup,
+            mix={"dashboard": 1.0}, seed=args.seed, prefix="workers-",
+        )
+        results = asyncio.run(bench_load.run(load_args))
+    finally:
+        stop_server(server)
+    dashboard = results["endpoints"].get("dashboard", {"throughput": 0.0, "p95_ms": 0.0, "errors": {}})
+    return {"workers": workers, "throughput": dashboard["throughput"], "p95_ms": dashboard["p95_ms"],
+            "errors": sum(dashboard["errors"].values())}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="/api/dashboard throughput by number of worker processes")
+    parser.add_argument("--workers", default=default_worker_counts(), help="Comma-separated worker counts")
+    parser.add_argument("--server", choices=("auto", "uvicorn", "gunicorn"), default="auto")
+    parser.add_argument("--database-url", default=None, help="Default: a fresh SQLite file")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--members", type=int, default=1000)
+    parser.add_argument("--sessions", type=int, default=50)
+    parser.add_argument("--clients", type=int, default=64, help="Concurrent virtual clients")
+    parser.add_argument("--duration", type=float, default=15.0)
+    parser.add_argument("--warmup", type=float, default=2.0)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", default=None, help="Write results to this JSON file")
+    args = parser.parse_args()
+    if args.database_url is None:
+        args.database_url = f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='bench-'), 'bench.db')}"
+        os.environ["DATABASE_URL"] = args.database_url  # seed_members imports the app's modules
+
+    rows = [measure(args, int(n)) for n in args.workers.split(",")]
+    base = rows[0]["throughput"] / rows[0]["workers"] or 1.0
+    print(f"{'workers':>7} {'req/s':>9} {'p95 ms':>9} {'speedup':>8} {'per-worker':>10} {'errors':>7}")
+    for row in rows:
+        row["efficiency"] = round(row["throughput"] / row["workers"] / base, 2)
+        print(f"{row['workers']:>7} {row['throughput']:>9.1f} {row['p95_ms']:>9.1f} "
+              f"{row['throughput'] / rows[0]['throughput'] if rows[0]['throughput'] else 0:>7.2f}x "
+              f"{row['efficiency']:>9.0%} {row['errors']:>7}")
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w") as f:
+            json.dump({"cpus": os.cpu_count(), "server": args.server, "rows": rows}, f, indent=2)
@@ -0,0 +1,69 @@
+# backend/tests/conftest.py
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
+from main import app
+from database import Base, get_async_db
+from auth import login_limiter
+from barcodes import barcode_cache
+from ratelimit import FakeBackend
+from revocation import revocation_cache, token_versions
+
+# File-backed SQLite so the sync test session and the app's async session share data
+TEST_DB = os.path.join(os.path.dirname(__file__), "test.db")
+_engine = create_engine(f"sqlite:///{TEST_DB}", connect_args={"check_same_thread": False})
+_async_engine = create_async_engine(f"sqlite+aiosqlite:///{TEST_DB}", poolclass=NullPool)
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=_engine)
+AsyncTestingSessionLocal = async_sessionmaker(_async_engine, expire_on_commit=False)
+
+
+@pytest.fixture(autouse=True)
+def login_rate_limits():
+    # Every test logs in from "testclient"; give each one fresh buckets
+    backend = login_limiter.backend
+    login_limiter.backend = FakeBackend()
+    yield login_limiter.backend
+    login_limiter.backend = backend
+
+@pytest.fixture(autouse=True)
+def fresh_token_versions():
+    # Test databases are recreated, so user ids (and their cached versions) repeat across tests
+    token_versions.reset()
+    yield
+
+@pytest.fixture
+def engine():
+    Base.metadata.create_all(bind=_engine)
+    yield _engine
+    Base.metadata.drop_all(bind=_engine)
+
+@pytest.fixture
+def async_engine(engine):
+    return _async_engine
+
+@pytest.fixture
+def db(engine):
+    db = TestingSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+@pytest.fixture
+def client(db):
+    async def override_get_async_db():
+        async with AsyncTestingSessionLocal() as session:
+            yield session
+
+    app.dependency_overrides[get_async_db] = override_get_async_db
+    revocation_cache.reset()
+    barcode_cache.clear()
+    yield TestClient(app)
+    app.dependency_overrides.clear()
@@ -1,36 +1,210 @@
-# generate_fake_users.py
-from faker import Faker
+# fake_users.py
+# Deterministic synthetic members, from a handful to millions. Chunks are generated in
+# parallel processes from (seed, chunk index), so the output is identical whatever the
+# worker count. Writes NDJSON (or a JSON array for .json) or inserts straight into the DB.
+#
+#   uv run python tests/fake_users.py                                   # 20 members -> fake_users-b2.json
+#   uv run python tests/fake_users.py --count 2000000 --output members.ndjson --workers 8
+#   uv run python tests/fake_users.py --count 100000 --database-url sqlite:///./membership.db
+#
+# Records carry the plain password (for logging in during load tests) and a bcrypt hash
+# from a small cached pool, so import_members.py never has to run bcrypt per member.
+import argparse
 import json
+import os
+import random
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
 
-fake = Faker()
-
-# Generate 20 fake user profiles
-users = []
-for _ in range(20):
-    user = {
-        "username": fake.user_name(),
-        "password": fake.password(length=10),  # Simple password for testing
-        "vip": {
-            "code": f"VIP{fake.random_number(digits=10, fix_len=True)}",  # VIP + 10-digit number (13 chars total)
-            "nascita": fake.date_of_birth(minimum_age=18, maximum_age=80).strftime("%Y-%m-%d"),
-            "cellulare": fake.phone_number(),
-            "sms": fake.boolean(),
-            "Punti": fake.random_int(min=0, max=1000),
-            "Sconto": fake.random_int(min=0, max=50),
-            "Nome": fake.first_name(),
-            "cognome": fake.last_name(),
-            "Email": fake.email(),
-            "Indirizzo": fake.street_address(),
-            "Citta": fake.city(),
-            "Prov": fake.state_abbr(),
-            "Cap": fake.postcode(),
-            "CodiceFiscale": fake.ssn(),  # Using SSN as a proxy for CodiceFiscale
-        }
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+CHUNK_SIZE = 10_000  # Part of the output's identity: changing it changes the members
+HASH_CACHE = os.path.join(os.path.dirname(__file__), "password_hashes.json")
+
+FIRST_NAMES = ["Marco", "Giulia", "Luca", "Francesca", "Alessandro", "Chiara", "Andrea", "Sara", "Matteo", "Elena",
+               "Lorenzo", "Valentina", "Davide", "Martina", "Simone", "Federica", "Stefano", "Silvia", "Paolo", "Anna"]
+LAST_NAMES = ["Rossi", "Russo", "Ferrari", "Esposito", "Bianchi", "Romano", "Colombo", "Ricci", "Marino", "Greco",
+              "Bruno", "Gallo", "Conti", "De Luca", "Mancini", "Costa", "Giordano", "Rizzo", "Lombardi", "Moretti"]
+CITIES = [("Roma", "RM", "00100"), ("Milano", "MI", "20100"), ("Napoli", "NA", "80100"), ("Torino", "TO", "10100"),
+          ("Palermo", "PA", "90100"), ("Genova", "GE", "16100"), ("Bologna", "BO", "40100"), ("Firenze", "FI", "50100"),
+          ("Bari", "BA", "70100"), ("Verona", "VR", "37100")]
+STREETS = ["Via Roma", "Via Garibaldi", "Corso Italia", "Via Mazzini", "Viale Europa", "Via Dante", "Piazza Verdi"]
+
+
+def password_hashes(count: int, cache_path: str = HASH_CACHE) -> list:
+    """[(password, bcrypt_hash)] for bench passwords pw-0..pw-N, hashed once and cached on disk."""
+    from auth import hash_password, pwd_context
+    cache = {}
+    if cache_path and os.path.exists(cache_path):
+        with open(cache_path) as f:
+            cache = json.load(f)
+    passwords = [f"pw-{i}" for i in range(count)]
+    # Hashes made under another bcrypt cost would make logins unrepresentative
+    missing = [p for p in passwords if p not in cache or pwd_context.needs_update(cache[p])]
+    if missing:
+        with ProcessPoolExecutor() as pool:
+            cache.update(zip(missing, pool.map(hash_password, missing)))
+        if cache_path:
+            with open(cache_path, "w") as f:
+                json.dump(cache, f)
+    return [(p, cache[p]) for p in passwords]
+
+
+def sample_images(count: int = 8) -> list:
+    # A few small distinct PNGs; members with a photo pick one
+    from PIL import Image
+    images = []
+    for i in range(count):
+        buffer = BytesIO()
+        Image.new("RGB", (96, 96), ((i * 97) % 256, (i * 53) % 256, (i * 29) % 256)).save(buffer, format="PNG")
+        images.append(buffer.getvalue())
+    return images
+
+
+class Distributions:
+    """Knobs for the generated population; everything else is uniform."""
+
+    def __init__(self, stores: int = 20, store_skew: float = 1.1, points_mean: float = 250.0,
+                 sms_rate: float = 0.3, omail_rate: float = 0.4, oposte_rate: float = 0.1, image_rate: float = 0.05):
+        self.stores = stores
+        self.points_mean = points_mean
+        self.sms_rate = sms_rate
+        self.omail_rate = omail_rate
+        self.oposte_rate = oposte_rate
+        self.image_rate = image_rate
+        # Zipf-like: a few flagship stores enroll most members
+        weights = [1 / (k ** store_skew) for k in range(1, stores + 1)]
+        total, running = sum(weights), 0.0
+        self.store_cum_weights = []
+        for w in weights:
+            running += w / total
+            self.store_cum_weights.append(running)
+
+
+def make_member(index: int, rng: random.Random, dist: Distributions, passwords: list, images: list, prefix: str) -> dict:
+    first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+    city, prov, cap = rng.choice(CITIES)
+    password, password_hash = passwords[index % len(passwords)]
+    vip = {
+        "code": f"VIP{index:010d}",
+        "nascita": f"{rng.randint(1945, 2006)}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+        "cellulare": f"3{rng.randint(100000000, 999999999)}",
+        "sms": rng.random() < dist.sms_rate,
+        "Punti": min(int(rng.expovariate(1 / dist.points_mean)), 100_000) if dist.points_mean else 0,
+        "Sconto": rng.choice((0, 0, 0, 5, 10, 15, 20)),
+        "inegozio": rng.choices(range(1, dist.stores + 1), cum_weights=dist.store_cum_weights)[0],
+        "P_importo": f"{rng.expovariate(1 / 40):.2f}",
+        "Nome": first,
+        "cognome": last,
+        "Email": f"{first}.{last}.{index}@example.com".lower().replace(" ", ""),
+        "Indirizzo": f"{rng.choice(STREETS)} {rng.randint(1, 200)}",
+        "Citta": city,
+        "Prov": prov,
+        "Cap": cap,
+        "sesso": rng.randint(0, 1),
+        "omail": rng.random() < dist.omail_rate,
+        "oposte": rng.random() < dist.oposte_rate,
     }
-    users.append(user)
+    if images and rng.random() < dist.image_rate:
+        vip["img"] = rng.choice(images)
+    return {"username": f"{prefix}{index:08d}", "password": password, "password_hash": password_hash, "vip": vip}
+
+
+def generate_chunk(chunk: int, count: int, seed: int, dist: Distributions, passwords: list, images: list,
+                   prefix: str, as_json: bool):
+    # One RNG per chunk keeps the output independent of how chunks are spread over workers
+    rng = random.Random(f"{seed}:{chunk}")
+    start = chunk * CHUNK_SIZE
+    members = [make_member(i, rng, dist, passwords, images, prefix) for i in range(start, min(start + CHUNK_SIZE, count))]
+    if not as_json:
+        return members
+    for member in members:
+        if "img" in member["vip"]:
+            member["vip"]["img"] = member["vip"]["img"].hex()  # Hex, like /api/dashboard returns it
+    return "".join(json.dumps(member, separators=(",", ":")) + "\n" for member in members)
+
+
+def generate(count: int, seed: int = 0, dist: Distributions = None, workers: int = None, passwords: int = 20,
+             prefix: str = "member", as_json: bool = True, hash_cache: str = HASH_CACHE):
+    """Yield chunks in order: NDJSON strings when as_json, else lists of record dicts."""
+    dist = dist or Distributions()
+    hashes = password_hashes(passwords, hash_cache)
+    images = sample_images() if dist.image_rate else []
+    chunks = range((count + CHUNK_SIZE - 1) // CHUNK_SIZE)
+    args = (count, seed, dist, hashes, images, prefix, as_json)
+    if workers == 1 or len(chunks) <= 1:
+        for chunk in chunks:
+            yield generate_chunk(chunk, *args)
+        return
+    workers = workers or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        # In order, with only a couple of chunks per worker in flight so memory stays flat
+        pending = deque()
+        for chunk in chunks:
+            pending.append(pool.submit(generate_chunk, chunk, *args))
+            if len(pending) >= workers * 2:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def write_file(path: str, chunks) -> int:
+    # NDJSON chunks are written as they arrive; a .json target gets them as one array
+    written = 0
+    array = path.endswith(".json")
+    with open(path, "w") as f:
+        f.write("[\n" if array else "")
+        for lines in chunks:
+            if array:
+                f.write((",\n" if written else "") + ",\n".join(lines.splitlines()))
+            else:
+                f.write(lines)
+            written += lines.count("\n")
+        f.write("\n]\n" if array else "")
+    return written
+
+
+def load_database(database_url: str, chunks) -> dict:
+    from sqlalchemy import create_engine
+    from import_members import MemberImporter
+    engine = create_engine(database_url)
+    try:
+        importer = MemberImporter(engine=engine, chunk_size=CHUNK_SIZE)
+        return importer.run(enumerate((member for members in chunks for member in members), 1))
+    finally:
+        engine.dispose()
+
 
-# Save to JSON file
-with open("fake_users-b2.json", "w") as f:
-    json.dump(users, f, indent=4)
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate deterministic synthetic members")
+    parser.add_argument("--count", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="fake_users-b2.json", help=".ndjson/.jsonl, or .json for a JSON array")
+    parser.add_argument("--database-url", default=None, help="Insert into this database instead of writing a file")
+    parser.add_argument("--workers", type=int, default=None, help="Generator processes (default: CPU count)")
+    parser.add_argument("--prefix", default="member", help="Username prefix; usernames are prefix + index")
+    parser.add_argument("--passwords", type=int, default=20, help="Distinct passwords (pw-0..), hashed once and cached")
+    parser.add_argument("--hash-cache", default=HASH_CACHE)
+    parser.add_argument("--stores", type=int, default=20, help="Number of stores (inegozio 1..N)")
+    parser.add_argument("--store-skew", type=float, default=1.1, help="Zipf exponent of members per store; 0 = uniform")
+    parser.add_argument("--points-mean", type=float, default=250.0, help="Mean loyalty points (exponential)")
+    parser.add_argument("--sms-rate", type=float, default=0.3)
+    parser.add_argument("--omail-rate", type=float, default=0.4)
+    parser.add_argument("--oposte-rate", type=float, default=0.1)
+    parser.add_argument("--image-rate", type=float, default=0.05, help="Share of members with a profile image")
+    args = parser.parse_args()
 
-print("Generated 20 fake user profiles in 'fake_users-b2.json'")
+    dist = Distributions(args.stores, args.store_skew, args.points_mean, args.sms_rate, args.omail_rate,
+                         args.oposte_rate, args.image_rate)
+    started = time.perf_counter()
+    chunks = generate(args.count, args.seed, dist, args.workers, args.passwords, args.prefix,
+                      as_json=args.database_url is None, hash_cache=args.hash_cache)
+    if args.database_url:
+        print(json.dumps(load_database(args.database_url, chunks)))
+    else:
+        written = write_file(args.output, chunks)
+        elapsed = time.perf_counter() - started
+        print(f"Generated {written} members in '{args.output}' ({elapsed:.1f}s, {written / elapsed:.0f}/s)")
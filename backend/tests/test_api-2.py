@@ -5,12 +5,14 @@ sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
 import pytest
 from fastapi.testclient import TestClient
-from sqlalchemy import create_engine, Column, Integer, String
+from sqlalchemy import create_engine, Column, DateTime, Integer, String
 from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
 from main import app  # Replace with your actual app module
 from auth import pwd_context  # Replace with your actual auth module
-from database import get_db  # Replace with your actual dependency module
+from database import get_async_db  # Replace with your actual dependency module
 from faker import Faker
 
 fake = Faker()
@@ -23,15 +25,28 @@ class User(Base):
     id = Column(Integer, primary_key=True, index=True)
     username = Column(String, unique=True, index=True, nullable=False)
     password = Column(String, nullable=False)
+    token_version = Column(Integer, nullable=False, default=0)
 
 class BlacklistedToken(Base):
     __tablename__ = "blacklisted_tokens"
     id = Column(Integer, primary_key=True, index=True)
     token = Column(String, unique=True, nullable=False)
 
-# Global in-memory SQLite engine
-engine = create_engine("sqlite:///:memory:", connect_args={"check_same_thread": False})
+class RefreshToken(Base):
+    __tablename__ = "refresh_tokens"
+    id = Column(Integer, primary_key=True)
+    digest = Column(String(64), unique=True, nullable=False)
+    user_id = Column(Integer, nullable=False)
+    family = Column(String(32), nullable=False)
+    expires_at = Column(DateTime, nullable=False)
+    used_at = Column(DateTime, nullable=True)
+
+# Global file-backed SQLite engine, shared with the app's async session
+TEST_DB = os.path.join(os.path.dirname(__file__), "test_api-2.db")
+engine = create_engine(f"sqlite:///{TEST_DB}", connect_args={"check_same_thread": False})
 TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+async_engine = create_async_engine(f"sqlite+aiosqlite:///{TEST_DB}", poolclass=NullPool)
+AsyncTestingSessionLocal = async_sessionmaker(async_engine, expire_on_commit=False)
 
 @pytest.fixture(scope="function")
 def db():
@@ -48,9 +63,14 @@ def db():
 @pytest.fixture
 def client(db):
     # Override the app's database dependency
-    app.dependency_overrides[get_db] = lambda: db
+    async def override_get_async_db():
+        async with AsyncTestingSessionLocal() as session:
+            yield session
+
+    app.dependency_overrides[get_async_db] = override_get_async_db
     print(f"DB engine in test: {db.bind}")
-    return TestClient(app)
+    yield TestClient(app)
+    app.dependency_overrides.clear()
 
 @pytest.fixture
 def payload():
@@ -6,18 +6,23 @@ sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 import pytest
 from fastapi.testclient import TestClient
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker, Session
+from sqlalchemy.pool import NullPool
 from main import app  # Adjust import path
-from database import Base, get_db  # Import Base and get_db from database.py
+from database import Base, get_async_db  # Import Base and get_async_db from database.py
 from models import User, BlacklistedToken  # Import models from models.py
 from auth import pwd_context, create_access_token, verify_token  # Adjust import path
 from faker import Faker
 
 fake = Faker()
 
-# In-memory SQLite engine for testing
-engine = create_engine("sqlite:///:memory:", connect_args={"check_same_thread": False})
+# File-backed SQLite so the sync test session and the app's async session share data
+TEST_DB = os.path.join(os.path.dirname(__file__), "test_api-3.db")
+engine = create_engine(f"sqlite:///{TEST_DB}", connect_args={"check_same_thread": False})
 TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+async_engine = create_async_engine(f"sqlite+aiosqlite:///{TEST_DB}", poolclass=NullPool)
+AsyncTestingSessionLocal = async_sessionmaker(async_engine, expire_on_commit=False)
 
 @pytest.fixture(scope="function")
 def db():
@@ -32,8 +37,12 @@ def db():
 
 @pytest.fixture
 def client(db: Session):
-    # Override the app's get_db dependency with the test session
-    app.dependency_overrides[get_db] = lambda: db
+    # Override the app's get_async_db dependency with the test database
+    async def override_get_async_db():
+        async with AsyncTestingSessionLocal() as session:
+            yield session
+
+    app.dependency_overrides[get_async_db] = override_get_async_db
     yield TestClient(app)
     # Clean up overrides after the test
     app.dependency_overrides.clear()
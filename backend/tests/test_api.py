@@ -6,9 +6,11 @@ sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 import pytest
 from fastapi.testclient import TestClient
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
 
-from main import app, get_db, User, BlacklistedToken  # Adjust imports as needed
+from main import app, get_async_db, User, BlacklistedToken  # Adjust imports as needed
 from models import Base, User
 from auth import pwd_context
 
@@ -21,9 +23,12 @@ client = TestClient(app)
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 
-# In-memory SQLite engine
-engine = create_engine("sqlite:///:memory:", connect_args={"check_same_thread": False})
+# File-backed SQLite engine, shared with the app's async session
+TEST_DB = os.path.join(os.path.dirname(__file__), "test_api.db")
+engine = create_engine(f"sqlite:///{TEST_DB}", connect_args={"check_same_thread": False})
 TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+async_engine = create_async_engine(f"sqlite+aiosqlite:///{TEST_DB}", poolclass=NullPool)
+AsyncTestingSessionLocal = async_sessionmaker(async_engine, expire_on_commit=False)
 
 @pytest.fixture(scope="function")
 def db():
@@ -40,14 +45,13 @@ def db():
 @pytest.fixture
 def client(db):
     # Override the app's database dependency
-    def override_db():
-        try:
-            yield db
-        finally:
-            db.close()
-
-    app.dependency_overrides[get_db] = override_db  # Replace with your actual dependency
-    return TestClient(app)
+    async def override_db():
+        async with AsyncTestingSessionLocal() as session:
+            yield session
+
+    app.dependency_overrides[get_async_db] = override_db  # Replace with your actual dependency
+    yield TestClient(app)
+    app.dependency_overrides.clear()
 #===========
 @pytest.fixture
 def payload():
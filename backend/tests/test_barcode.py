@@ -0,0 +1,89 @@
+# backend/tests/test_barcode.py
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import pytest
+from barcodes import BarcodeCache, barcode_cache, barcode_key, code128_bars, WRITER_OPTIONS
+
+@pytest.fixture
+def token(client):
+    payload = {"user": {"username": "scanner", "password": "test123"}, "vip": {"code": "VIP0000000042"}}
+    assert client.post("/signup/", json=payload).status_code == 200
+    response = client.post("/api/login", data={"username": "scanner", "password": "test123"})
+    return response.json()["access_token"]
+
+def test_barcode_png_with_etag(client, token):
+    response = client.get("/api/barcode", headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "image/png"
+    assert response.content.startswith(b"\x89PNG")
+    assert response.headers["etag"].startswith('"')
+    assert "max-age" in response.headers["cache-control"]
+
+def test_barcode_not_modified(client, token):
+    headers = {"Authorization": f"Bearer {token}"}
+    etag = client.get("/api/barcode", headers=headers).headers["etag"]
+    response = client.get("/api/barcode", headers={**headers, "If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.content == b""
+    assert response.headers["etag"] == etag
+
+def test_barcode_not_modified_weak_etag(client, token):
+    headers = {"Authorization": f"Bearer {token}"}
+    etag = client.get("/api/barcode", headers=headers).headers["etag"]
+    response = client.get("/api/barcode", headers={**headers, "If-None-Match": f'"other", W/{etag}'})
+    assert response.status_code == 304
+
+@pytest.mark.parametrize("barcode_format", ["png", "svg"])
+def test_barcode_unencodable_code(client, barcode_format):
+    payload = {"user": {"username": "accent", "password": "test123"}, "vip": {"code": "VIPÈ00000001"}}
+    assert client.post("/signup/", json=payload).status_code == 200
+    token = client.post("/api/login", data={"username": "accent", "password": "test123"}).json()["access_token"]
+    response = client.get(f"/api/barcode?format={barcode_format}", headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 422
+
+def test_barcode_rendered_once(client, token):
+    headers = {"Authorization": f"Bearer {token}"}
+    before = barcode_cache.stats()
+    first = client.get("/api/barcode", headers=headers)
+    second = client.get("/api/barcode", headers=headers)
+    assert first.content == second.content
+    after = barcode_cache.stats()
+    assert after["misses"] - before["misses"] == 1
+    assert after["hits"] - before["hits"] == 1
+
+def test_cache_evicts_least_recently_used():
+    cache = BarcodeCache(max_bytes=10)
+    cache.put("a", b"12345")
+    cache.put("b", b"12345")
+    cache.get("a")
+    cache.put("c", b"12345")
+    assert cache.get("b") is None
+    assert cache.get("a") == b"12345"
+    assert cache.stats()["bytes"] == 10
+
+def test_cache_disk_tier(tmp_path):
+    key = barcode_key("VIP0000000042", WRITER_OPTIONS)
+    BarcodeCache(directory=str(tmp_path)).store(key, b"png-bytes")
+    assert BarcodeCache(directory=str(tmp_path)).load(key) == b"png-bytes"
+
+def test_barcode_svg(client, token):
+    headers = {"Authorization": f"Bearer {token}"}
+    png = client.get("/api/barcode", headers=headers)
+    response = client.get("/api/barcode?format=svg", headers=headers)
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("image/svg+xml")
+    assert response.content.startswith(b"<svg")
+    assert b"VIP0000000042" in response.content
+    assert response.headers["etag"] != png.headers["etag"]
+    assert len(response.content) < len(png.content)
+
+def test_code128_matches_reference_encoder():
+    from barcode import Code128
+    for code in ["VIP0000000042", "ABC", "1234", "hello world"]:
+        bars = code128_bars(code)
+        modules = ["0"] * (bars[-1][0] + bars[-1][1])
+        for x, width in bars:
+            modules[x:x + width] = ["1"] * width
+        assert "".join(modules) == Code128(code).build()[0]
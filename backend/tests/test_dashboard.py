@@ -0,0 +1,84 @@
+# backend/tests/test_dashboard.py
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from auth import create_access_token
+from revocation import revocation_cache
+
+@pytest.fixture
+def token(client):
+    payload = {
+        "user": {"username": "member", "password": "test123"},
+        "vip": {"code": "VIP0000000099", "Nome": "Mario", "cognome": "Rossi", "P_importo": "12.50"},
+    }
+    assert client.post("/signup/", json=payload).status_code == 200
+    token = client.post("/api/login", data={"username": "member", "password": "test123"}).json()["access_token"]
+    # Warm the revocation cache so later requests only run their own queries
+    revocation_cache.refresh_seconds = float("inf")
+    client.get("/api/dashboard", headers={"Authorization": f"Bearer {token}"})
+    return token
+
+def test_dashboard_single_query(client, token):
+    response = client.get("/api/dashboard", headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 200
+    assert response.json()["username"] == "member"
+    assert response.json()["vip"]["Nome"] == "Mario"
+    assert response.headers["X-DB-Queries"] == "1"
+
+def test_barcode_single_query(client, token):
+    response = client.get("/api/barcode?format=svg", headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 200
+    assert response.headers["X-DB-Queries"] == "1"
+
+def test_dashboard_token_without_uid(client, token):
+    legacy = create_access_token(data={"sub": "member"})
+    response = client.get("/api/dashboard", headers={"Authorization": f"Bearer {legacy}"})
+    assert response.status_code == 200
+    assert response.headers["X-DB-Queries"] == "1"
+
+def test_dashboard_unknown_user(client, token):
+    stranger = create_access_token(data={"sub": "ghost", "uid": 12345})
+    response = client.get("/api/dashboard", headers={"Authorization": f"Bearer {stranger}"})
+    assert response.status_code == 404
+
+def test_dashboard_typed_payload(client, token):
+    response = client.get("/api/dashboard", headers={"Authorization": f"Bearer {token}"})
+    assert response.headers["content-type"] == "application/json"
+    vip = response.json()["vip"]
+    assert len(vip) == 43
+    assert vip["P_importo"] == 12.5
+    assert vip["img"] is None
+    assert vip["code"] == "VIP0000000099"
+    assert isinstance(vip["idata"], str)
+
+def test_dashboard_sparse_fields(client, token):
+    response = client.get("/api/dashboard?fields=Nome,Punti", headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 200
+    assert response.json()["vip"] == {"IDvip": 1, "Nome": "Mario", "Punti": None}
+    assert response.headers["X-DB-Queries"] == "1"
+
+def test_dashboard_unknown_field(client, token):
+    response = client.get("/api/dashboard?fields=Nome,password", headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 400
+    assert "password" in response.json()["detail"]
+
+def test_dashboard_sparse_select_skips_deferred_columns(client, token):
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(Engine, "before_cursor_execute", capture)
+    try:
+        client.get("/api/dashboard?fields=Nome", headers={"Authorization": f"Bearer {token}"})
+        client.get("/api/dashboard", headers={"Authorization": f"Bearer {token}"})
+    finally:
+        event.remove(Engine, "before_cursor_execute", capture)
+    sparse, full = statements
+    assert "viptest.img" not in sparse
+    assert "viptest.Email" not in sparse
+    assert "viptest.img" in full
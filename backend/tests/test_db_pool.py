@@ -0,0 +1,58 @@
+# backend/tests/test_db_pool.py
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import threading
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from database import TimedQueuePool, create_metered_engine, engine_options
+
+TEST_DB = os.path.join(os.path.dirname(__file__), "test_db_pool.db")
+
+
+def test_engine_options_from_settings():
+    options = engine_options(f"sqlite:///{TEST_DB}", TimedQueuePool)
+    assert options["poolclass"] is TimedQueuePool
+    assert options["pool_pre_ping"] is True
+    assert options["pool_recycle"] == 1800
+    # In-memory SQLite keeps its single-connection pool
+    assert "pool_size" not in engine_options("sqlite://", TimedQueuePool)
+
+def test_pool_metrics_track_checkouts_and_waits():
+    engine, metrics = create_metered_engine(
+        lambda url, **kw: create_engine(url, **{**kw, "pool_size": 1, "max_overflow": 0}),
+        f"sqlite:///{TEST_DB}", TimedQueuePool,
+    )
+    held = engine.connect()
+    held.execute(text("SELECT 1"))
+    stats = metrics.stats()
+    assert stats["size"] == 1
+    assert stats["checked_out"] == 1
+    assert stats["connections_opened"] == 1
+
+    # A second checkout has to wait until the first connection comes back
+    threading.Timer(0.1, held.close).start()
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+    stats = metrics.stats()
+    assert stats["checkouts"] == 2
+    assert stats["checkout_wait_seconds_max"] >= 0.05
+    assert stats["checked_out"] == 0
+
+    engine.dispose()
+    stats = metrics.stats()
+    assert stats["connections_closed"] == 1
+    assert stats["connection_lifetime_seconds_max"] > 0
+
+def test_pool_timeout_raises():
+    engine, metrics = create_metered_engine(
+        lambda url, **kw: create_engine(url, **{**kw, "pool_size": 1, "max_overflow": 0, "pool_timeout": 0.05}),
+        f"sqlite:///{TEST_DB}", TimedQueuePool,
+    )
+    with engine.connect():
+        with pytest.raises(PoolTimeoutError):
+            engine.connect()
+    assert metrics.stats()["checkout_wait_seconds_max"] >= 0.04
+    engine.dispose()
@@ -0,0 +1,144 @@
+# backend/tests/test_import_members.py
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import json
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.exc import DataError
+from sqlalchemy.orm import sessionmaker
+from auth import hash_password, verify_password
+from database import Base
+from models import User, VIPTable
+from import_members import import_members, iter_records
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'import.db'}")
+    Base.metadata.create_all(bind=engine)
+    yield engine
+    engine.dispose()
+
+def test_import_ndjson(engine, tmp_path):
+    source = tmp_path / "members.ndjson"
+    records = [
+        {"username": "anna", "password": "pw-anna", "vip": {"code": "VIP0000000001", "Punti": 10}},
+        {"username": "bruno", "password": "pw-bruno", "vip": {"code": "VIP0000000002"}},
+        {"username": "anna", "password": "again", "vip": {}},  # Duplicate in file
+        {"username": "", "password": "x", "vip": {}},  # Invalid
+        {"username": "carla", "password_hash": hash_password("pw-carla"), "vip": {"Punti": "not a number"}},
+    ]
+    source.write_text("\n".join(json.dumps(r) for r in records))
+    rejects = tmp_path / "rejects.ndjson"
+
+    stats = import_members(str(source), chunk_size=2, workers=2, rejects_path=str(rejects), engine=engine)
+    assert stats["processed"] == 5
+    assert stats["inserted"] == 2
+    assert stats["rejected"] == 3
+    reasons = [json.loads(line)["reason"] for line in rejects.read_text().splitlines()]
+    assert "duplicate username" in reasons
+    assert all("password" not in line for line in rejects.read_text().splitlines())
+
+    db = sessionmaker(bind=engine)()
+    users = {u.username: u for u in db.query(User)}
+    assert set(users) == {"anna", "bruno"}
+    assert verify_password("pw-anna", users["anna"].password)
+    assert db.query(VIPTable).filter(VIPTable.IDvip == users["anna"].id).one().Punti == 10
+    db.close()
+
+def test_import_skips_existing_usernames(engine, tmp_path):
+    db = sessionmaker(bind=engine)()
+    db.add(User(username="dario", password=hash_password("old")))
+    db.commit()
+    db.close()
+    source = tmp_path / "members.csv"
+    source.write_text("username,password,code,Punti\ndario,pw,VIP1,1\nelena,pw-elena,VIP2,\n")
+
+    stats = import_members(str(source), workers=1, engine=engine)
+    assert stats["inserted"] == 1
+    assert stats["rejected"] == 1
+
+def read_rejects(path):
+    return [json.loads(line) for line in path.read_text().splitlines()]
+
+def test_malformed_ndjson_line_is_rejected(engine, tmp_path):
+    source = tmp_path / "members.ndjson"
+    source.write_text('{"username": "gina", "password": "pw"}\n\n{"username": "hugo", "password": \n{"username": "ivo", "password": "pw"}\n')
+    rejects = tmp_path / "rejects.ndjson"
+
+    stats = import_members(str(source), workers=1, rejects_path=str(rejects), engine=engine)
+    assert (stats["inserted"], stats["rejected"]) == (2, 1)
+    [reject] = read_rejects(rejects)
+    assert reject["line"] == 3
+    assert reject["record"] is None  # The raw line may hold the password
+
+def test_non_object_array_element_is_rejected(engine, tmp_path):
+    source = tmp_path / "members.json"
+    source.write_text(json.dumps([{"username": "lara", "password": "pw"}, 5, {"username": "marco", "password": "pw", "vip": "x"}]))
+    rejects = tmp_path / "rejects.ndjson"
+
+    stats = import_members(str(source), workers=1, rejects_path=str(rejects), engine=engine)
+    assert (stats["inserted"], stats["rejected"]) == (1, 2)
+    assert [r["line"] for r in read_rejects(rejects)] == [2, 3]
+
+def test_database_error_rejects_only_the_bad_row(engine, tmp_path):
+    # A value that passes validation but the database refuses (MySQL strict mode) fails only its row
+    @event.listens_for(engine, "before_cursor_execute")
+    def refuse_mallory(conn, cursor, statement, parameters, context, executemany):
+        if any(row.get("username") == "mallory" for row in getattr(context, "compiled_parameters", [])):
+            raise DataError(statement, parameters, Exception("Data too long for column 'username'"))
+
+    source = tmp_path / "members.csv"
+    source.write_text("username,password\nnora,pw\nmallory,pw\noscar,pw\n")
+    rejects = tmp_path / "rejects.ndjson"
+
+    stats = import_members(str(source), workers=1, rejects_path=str(rejects), engine=engine)
+    assert (stats["inserted"], stats["rejected"]) == (2, 1)
+    [reject] = read_rejects(rejects)
+    assert reject["line"] == 3
+    assert "Data too long" in reject["reason"]
+
+def test_unrecognised_password_hash_is_rejected(engine, tmp_path):
+    source = tmp_path / "members.ndjson"
+    records = [
+        {"username": "pia", "password_hash": "plaintext"},
+        {"username": "quinto", "password_hash": hash_password("pw-quinto")},
+    ]
+    source.write_text("\n".join(json.dumps(r) for r in records))
+    rejects = tmp_path / "rejects.ndjson"
+
+    stats = import_members(str(source), workers=1, rejects_path=str(rejects), engine=engine)
+    assert (stats["inserted"], stats["rejected"]) == (1, 1)
+    [reject] = read_rejects(rejects)
+    assert reject["line"] == 1
+    assert "password_hash" in reject["reason"]
+
+def test_iter_records_csv_drops_empty_cells(tmp_path):
+    source = tmp_path / "members.csv"
+    source.write_text("username,password,Punti,Nome\nfabio,pw,,Fabio\n")
+    assert list(iter_records(str(source))) == [
+        (2, {"username": "fabio", "password": "pw", "password_hash": None, "vip": {"Nome": "Fabio"}})
+    ]
+
+def test_generated_members_import_with_images(engine, tmp_path):
+    from fake_users import Distributions, generate, write_file
+    dist = Distributions(stores=3, image_rate=0.5)
+    chunks = generate(40, seed=7, dist=dist, workers=1, passwords=2, hash_cache=str(tmp_path / "hashes.json"))
+    source = tmp_path / "members.ndjson"
+    assert write_file(str(source), chunks) == 40
+    # Same seed, same members; the hash cache is reused rather than recomputed
+    again = "".join(generate(40, seed=7, dist=dist, workers=1, passwords=2, hash_cache=str(tmp_path / "hashes.json")))
+    assert again == source.read_text()
+
+    stats = import_members(str(source), workers=1, engine=engine)
+    assert stats["inserted"] == 40
+    db = sessionmaker(bind=engine)()
+    vips = db.query(VIPTable).all()
+    assert {vip.inegozio for vip in vips} <= {1, 2, 3}
+    # Hex-encoded images in the NDJSON land as the original PNG bytes
+    assert any(vip.img and vip.img.startswith(b"\x89PNG") for vip in vips)
+    user = db.query(User).filter(User.username == "member00000001").one()
+    assert verify_password("pw-1", user.password)
+    db.close()
@@ -0,0 +1,66 @@
+# backend/tests/test_jwt_cache.py
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from datetime import timedelta
+import pytest
+from fastapi import HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from auth import create_access_token, verify_token_payload
+from jwt_cache import ClaimsCache, claims_cache
+
+
+def test_cache_hit_and_lru_eviction():
+    cache = ClaimsCache(max_tokens=2, clock=lambda: 1000)
+    for name in ("a", "b"):
+        cache.put(name, {"sub": name, "exp": 2000})
+    assert cache.get("a")["sub"] == "a"  # "a" is now the most recent
+    cache.put("c", {"sub": "c", "exp": 2000})
+    assert cache.get("b") is None
+    assert cache.get("a") is not None and cache.get("c") is not None
+    assert cache.stats()["hits"] == 3
+
+def test_entries_evicted_at_exp():
+    now = [1000]
+    cache = ClaimsCache(clock=lambda: now[0])
+    cache.put("t", {"sub": "x", "exp": 1010})
+    assert cache.get("t") is not None
+    now[0] = 1010
+    assert cache.get("t") is None
+    assert cache.stats() == {"tokens": 0, "max_tokens": cache.max_tokens, "hits": 1, "misses": 1, "expired": 1}
+
+def test_invalidate():
+    cache = ClaimsCache()
+    cache.put("t", {"sub": "x", "exp": 2 ** 40})
+    cache.invalidate("t")
+    assert cache.get("t") is None
+
+@pytest.mark.asyncio
+async def test_verify_uses_cache_for_repeat_tokens(monkeypatch):
+    import auth
+    calls = []
+    decode = auth.jwt.decode
+    monkeypatch.setattr(auth.jwt, "decode", lambda *a, **kw: calls.append(1) or decode(*a, **kw))
+    # Tokens without uid skip the token_version lookup, so no DB is needed
+    token = create_access_token(data={"sub": "cached"})
+    monkeypatch.setattr(auth.revocation_cache, "is_stale", lambda: False)
+    engine = create_async_engine("sqlite+aiosqlite://")
+    async with AsyncSession(engine) as db:
+        for _ in range(3):
+            assert (await verify_token_payload(token, db))["sub"] == "cached"
+    await engine.dispose()
+    assert len(calls) == 1
+
+@pytest.mark.asyncio
+async def test_expired_token_still_rejected(monkeypatch):
+    import auth
+    monkeypatch.setattr(auth.revocation_cache, "is_stale", lambda: False)
+    token = create_access_token(data={"sub": "old"}, expires_delta=timedelta(seconds=-1))
+    claims_cache.put(token, {"sub": "old", "exp": 0})
+    engine = create_async_engine("sqlite+aiosqlite://")
+    async with AsyncSession(engine) as db:
+        with pytest.raises(HTTPException) as e:
+            await verify_token_payload(token, db)
+    await engine.dispose()
+    assert e.value.status_code == 401
@@ -0,0 +1,85 @@
+# backend/tests/test_logout_all.py
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from itertools import cycle
+import pytest
+from jose import jwt
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
+import database
+from database import Base
+from models import BlacklistedToken, User, VIPTable
+from auth import create_access_token
+from revocation import token_versions
+
+def login(client):
+    response = client.post("/api/login", data={"username": "roamer", "password": "test123"})
+    assert response.status_code == 200
+    return response.json()
+
+@pytest.fixture
+def sessions(client):
+    payload = {"user": {"username": "roamer", "password": "test123"}, "vip": {"code": "VIP0000000022"}}
+    assert client.post("/signup/", json=payload).status_code == 200
+    return [login(client) for _ in range(3)]  # Three devices
+
+def auth(tokens):
+    return {"Authorization": f"Bearer {tokens['access_token']}"}
+
+def test_access_token_carries_version(sessions):
+    assert jwt.get_unverified_claims(sessions[0]["access_token"])["ver"] == 0
+
+def test_logout_all_revokes_every_device(client, sessions, db):
+    response = client.post("/api/logout/all", headers=auth(sessions[0]))
+    assert response.status_code == 200
+    for tokens in sessions:
+        response = client.get("/api/dashboard", headers=auth(tokens))
+        assert response.status_code == 401
+        assert response.json()["detail"] == "Token has been revoked"
+        assert client.post("/api/refresh", data={"refresh_token": tokens["refresh_token"]}).status_code == 401
+
+    # A counter bump, not one blacklist row per token
+    assert db.query(User).one().token_version == 1
+    assert db.query(BlacklistedToken).count() == 0
+
+    # Logging in again works, with the new version
+    fresh = login(client)
+    assert jwt.get_unverified_claims(fresh["access_token"])["ver"] == 1
+    assert client.get("/api/dashboard", headers=auth(fresh)).status_code == 200
+
+def test_version_check_is_cached(client, sessions):
+    client.get("/api/dashboard", headers=auth(sessions[0]))
+    misses = token_versions.misses
+    response = client.get("/api/dashboard", headers=auth(sessions[1]))
+    assert response.status_code == 200
+    assert token_versions.misses == misses
+
+def test_logout_all_needs_uid_claim(client, sessions, db):
+    legacy = {"access_token": create_access_token(data={"sub": "roamer"})}
+    response = client.post("/api/logout/all", headers=auth(legacy))
+    assert response.status_code == 401
+    assert db.query(User).one().token_version == 0
+
+def test_login_after_logout_all_on_lagging_replica(client, sessions, db, monkeypatch, tmp_path):
+    # The replica still has the member at token_version 0 when they log in again
+    replica_db = tmp_path / "replica.db"
+    replica_engine = create_engine(f"sqlite:///{replica_db}")
+    Base.metadata.create_all(bind=replica_engine)
+    user = db.query(User).one()
+    with sessionmaker(bind=replica_engine)() as replica:
+        replica.add(User(id=user.id, username=user.username, password=user.password, token_version=0))
+        replica.add(VIPTable(IDvip=user.id, code="VIP0000000022"))
+        replica.commit()
+    ReplicaSessionLocal = async_sessionmaker(create_async_engine(f"sqlite+aiosqlite:///{replica_db}", poolclass=NullPool), expire_on_commit=False)
+    monkeypatch.setattr(database, "_next_replica", cycle([ReplicaSessionLocal]))
+
+    assert client.post("/api/logout/all", headers=auth(sessions[0])).status_code == 200
+    client.cookies.clear()  # Past the read-your-writes window, but the replica still lags
+    fresh = login(client)
+    assert jwt.get_unverified_claims(fresh["access_token"])["ver"] == 1
+    assert client.get("/api/dashboard", headers=auth(fresh)).status_code == 200
+    replica_engine.dispose()
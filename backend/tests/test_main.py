@@ -9,6 +9,8 @@ from main import app
 from database import SessionLocal, Base, engine
 from models import User, BlacklistedToken
 from auth import hash_password, create_access_token
+from revocation import revocation_digest
+from jose import jwt
 
 
 # Define the client as a pytest fixture
@@ -74,7 +76,8 @@ async def test_logout_success(client, db):
     assert response.json()["message"] == "Logged out successfully"
 
     # Verify token is blacklisted
-    blacklisted = db.query(BlacklistedToken).filter(BlacklistedToken.token == token).first()
+    digest = revocation_digest(token, jwt.get_unverified_claims(token))
+    blacklisted = db.query(BlacklistedToken).filter(BlacklistedToken.digest == digest).first()
     assert blacklisted is not None
 
 @pytest.mark.asyncio
@@ -0,0 +1,49 @@
+# backend/tests/test_metrics.py
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import pytest
+from fastapi.testclient import TestClient
+from main import app
+from metrics import Histogram, RequestMetrics, format_labels, request_metrics
+
+
+@pytest.fixture
+def client():
+    request_metrics.reset()
+    yield TestClient(app)
+
+def test_histogram_buckets_are_cumulative():
+    histogram = Histogram(buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 0.5, 3.0):
+        histogram.observe(("GET",), value)
+    lines = histogram.render("latency", ("method",))
+    assert 'latency_bucket{method="GET",le="0.1"} 1' in lines
+    assert 'latency_bucket{method="GET",le="1.0"} 3' in lines
+    assert 'latency_bucket{method="GET",le="+Inf"} 4' in lines
+    assert 'latency_count{method="GET"} 4' in lines
+    assert 'latency_sum{method="GET"} 4.050000' in lines
+
+def test_label_values_are_escaped():
+    assert format_labels({"route": 'a"b\\c'}) == '{route="a\\"b\\\\c"}'
+
+def test_requests_are_labelled_by_route_template(client):
+    client.get("/api/dashboard")  # 401, no token
+    client.get("/no/such/path")
+    body = client.get("/metrics").text
+    assert 'http_requests_total{method="GET",route="/api/dashboard",status="401"} 1' in body
+    assert 'http_requests_total{method="GET",route="unmatched",status="404"} 1' in body
+    assert 'http_request_duration_seconds_count{method="GET",route="/api/dashboard",status="401"} 1' in body
+    # The scrape itself is still in flight while it renders
+    assert "http_requests_in_flight 1" in body
+    assert 'worker_pool_queue_depth{pool="hash"} 0' in body
+
+def test_metrics_content_type(client):
+    response = client.get("/metrics")
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+
+def test_record_without_routes():
+    metrics = RequestMetrics()
+    metrics.record("POST", "/api/login", 200, 0.2)
+    assert metrics.requests[("POST", "/api/login", "200")] == 1
@@ -0,0 +1,39 @@
+# backend/tests/test_password_upgrade.py
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from sqlalchemy import select
+from auth import BCRYPT_ROUNDS, make_password_context, pwd_context
+from calibrate_password_hash import calibrate_bcrypt
+from models import User
+
+def stored_hash(db) -> str:
+    return db.scalar(select(User.password))
+
+def test_cheap_hash_upgraded_on_login(client, db):
+    legacy = make_password_context(["bcrypt"], bcrypt_rounds=4).hash("test123")
+    db.add(User(username="legacy", password=legacy))
+    db.commit()
+    assert pwd_context.needs_update(legacy)
+
+    assert client.post("/api/login", data={"username": "legacy", "password": "test123"}).status_code == 200
+    upgraded = stored_hash(db)
+    assert upgraded.startswith(f"$2b${BCRYPT_ROUNDS:02d}$")
+    assert not pwd_context.needs_update(upgraded)
+
+    # Already current: the next login leaves it alone
+    assert client.post("/api/login", data={"username": "legacy", "password": "test123"}).status_code == 200
+    assert stored_hash(db) == upgraded
+
+def test_wrong_password_does_not_upgrade(client, db):
+    legacy = make_password_context(["bcrypt"], bcrypt_rounds=4).hash("test123")
+    db.add(User(username="legacy", password=legacy))
+    db.commit()
+    assert client.post("/api/login", data={"username": "legacy", "password": "nope"}).status_code == 401
+    assert stored_hash(db) == legacy
+
+def test_calibrate_bcrypt_meets_target():
+    settings, ms = calibrate_bcrypt(target_ms=50, samples=1, log=lambda *_: None)
+    assert 4 <= settings["BCRYPT_ROUNDS"] < BCRYPT_ROUNDS
+    assert ms <= 50
@@ -0,0 +1,41 @@
+# backend/tests/test_pools.py
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import asyncio
+import time
+import pytest
+from fastapi import HTTPException
+from pools import BoundedPool
+from auth import hash_password_async, verify_password_async
+
+
+@pytest.mark.asyncio
+async def test_pool_runs_calls_and_records_wait():
+    pool = BoundedPool("test", workers=1, max_queue=10)
+    results = await asyncio.gather(*(pool.run(time.sleep, 0.05) for _ in range(3)))
+    assert results == [None, None, None]
+    stats = pool.stats()
+    assert stats["completed"] == 3
+    assert stats["queue_depth"] == 0
+    # Calls behind the single worker had to wait for a slot
+    assert stats["wait_seconds_max"] > 0.03
+    pool.shutdown()
+
+@pytest.mark.asyncio
+async def test_pool_rejects_when_queue_full():
+    pool = BoundedPool("test", workers=1, max_queue=1)
+    tasks = [asyncio.create_task(pool.run(time.sleep, 0.1)) for _ in range(3)]
+    results = await asyncio.gather(*tasks, return_exceptions=True)
+    rejected = [r for r in results if isinstance(r, HTTPException)]
+    assert len(rejected) == 1
+    assert rejected[0].status_code == 503
+    assert pool.stats()["rejected"] == 1
+    pool.shutdown()
+
+@pytest.mark.asyncio
+async def test_hash_and_verify_off_loop():
+    hashed = await hash_password_async("test123")
+    assert await verify_password_async("test123", hashed)
+    assert not await verify_password_async("wrong", hashed)
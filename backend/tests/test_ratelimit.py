@@ -0,0 +1,70 @@
+# backend/tests/test_ratelimit.py
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from types import SimpleNamespace
+import pytest
+from fastapi import HTTPException
+import ratelimit
+from ratelimit import FakeBackend, LoginLimiter, client_ip
+
+@pytest.mark.asyncio
+async def test_token_bucket_refills():
+    backend = FakeBackend()
+    assert [await backend.take("k", rate=1.0, burst=2) for _ in range(2)] == [0.0, 0.0]
+    assert await backend.take("k", rate=1.0, burst=2) == pytest.approx(1.0)
+    backend.advance(0.5)
+    assert await backend.take("k", rate=1.0, burst=2) == pytest.approx(0.5)
+    backend.advance(0.5)
+    assert await backend.take("k", rate=1.0, burst=2) == 0.0
+
+@pytest.mark.asyncio
+async def test_memory_backend_evicts_idle_buckets():
+    backend = FakeBackend(max_keys=2)
+    for key in ("a", "b", "c"):
+        await backend.take(key, rate=1.0, burst=1)
+    assert list(backend._buckets) == ["b", "c"]
+
+@pytest.mark.asyncio
+async def test_per_username_limit_spans_ips(monkeypatch):
+    monkeypatch.setattr(ratelimit, "LOGIN_USER_BURST", 2)
+    limiter = LoginLimiter(backend=FakeBackend())
+    await limiter.check("10.0.0.1", "Anna")
+    await limiter.check("10.0.0.2", "anna")
+    with pytest.raises(HTTPException) as e:
+        await limiter.check("10.0.0.3", "ANNA")
+    assert e.value.status_code == 429
+    assert int(e.value.headers["Retry-After"]) >= 1
+    assert limiter.stats()["rejected_user"] == 1
+
+def test_client_ip_ignores_spoofed_forwarded_entries():
+    def request(forwarded):
+        return SimpleNamespace(headers={"x-forwarded-for": forwarded}, client=SimpleNamespace(host="10.0.0.9"))
+    # Client sent "1.2.3.4"; the proxy appended the real peer, 203.0.113.7
+    assert client_ip(request("1.2.3.4, 203.0.113.7"), trusted_proxies=1) == "203.0.113.7"
+    assert client_ip(request("1.2.3.4, 203.0.113.7, 10.0.0.2"), trusted_proxies=2) == "203.0.113.7"
+    assert client_ip(request("203.0.113.7"), trusted_proxies=2) == "203.0.113.7"
+    assert client_ip(request("1.2.3.4, 203.0.113.7"), trusted_proxies=0) == "10.0.0.9"
+
+def test_concurrency_cap_sheds_load():
+    limiter = LoginLimiter(backend=FakeBackend(), max_concurrent=1)
+    with limiter:
+        with pytest.raises(HTTPException) as e:
+            with limiter:
+                pass
+    assert e.value.status_code == 429
+    assert e.value.headers["Retry-After"] == "1"
+    assert limiter.verifying == 0
+
+def test_login_rate_limited_per_ip(client, login_rate_limits, monkeypatch):
+    monkeypatch.setattr(ratelimit, "LOGIN_IP_BURST", 3)
+    statuses = [client.post("/api/login", data={"username": f"user{i}", "password": "x"}).status_code for i in range(4)]
+    assert statuses == [401, 401, 401, 429]
+    response = client.post("/api/login", data={"username": "user9", "password": "x"})
+    assert response.status_code == 429
+    assert "Retry-After" in response.headers
+
+    # Buckets refill over time
+    login_rate_limits.advance(60)
+    assert client.post("/api/login", data={"username": "user9", "password": "x"}).status_code == 401
@@ -0,0 +1,59 @@
+# backend/tests/test_refresh.py
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from datetime import datetime, timedelta
+import pytest
+from models import RefreshToken
+from revocation import token_digest
+
+@pytest.fixture
+def tokens(client):
+    payload = {"user": {"username": "refresher", "password": "test123"}, "vip": {"code": "VIP0000000021"}}
+    assert client.post("/signup/", json=payload).status_code == 200
+    response = client.post("/api/login", data={"username": "refresher", "password": "test123"})
+    assert response.status_code == 200
+    return response.json()
+
+def test_login_returns_refresh_token(tokens, db):
+    assert tokens["token_type"] == "bearer"
+    assert tokens["expires_in"] == 30 * 60
+    assert tokens["refresh_token"]
+    # Only the digest is stored
+    row = db.query(RefreshToken).one()
+    assert row.digest == token_digest(tokens["refresh_token"])
+
+def test_refresh_rotates_without_bcrypt(client, tokens):
+    response = client.post("/api/refresh", data={"refresh_token": tokens["refresh_token"]})
+    assert response.status_code == 200
+    rotated = response.json()
+    assert rotated["refresh_token"] != tokens["refresh_token"]
+    # Lookup, claim and insert; no password hash involved
+    assert response.headers["X-DB-Queries"] == "3"
+    assert "auth;dur=" not in response.headers["Server-Timing"]
+
+    dashboard = client.get("/api/dashboard", headers={"Authorization": f"Bearer {rotated['access_token']}"})
+    assert dashboard.status_code == 200
+    assert dashboard.json()["username"] == "refresher"
+
+def test_reused_refresh_token_revokes_family(client, tokens):
+    rotated = client.post("/api/refresh", data={"refresh_token": tokens["refresh_token"]}).json()
+    replay = client.post("/api/refresh", data={"refresh_token": tokens["refresh_token"]})
+    assert replay.status_code == 401
+    assert replay.json()["detail"] == "Refresh token reused, please log in again"
+    # The legitimate holder's newer token died with the family
+    assert client.post("/api/refresh", data={"refresh_token": rotated["refresh_token"]}).status_code == 401
+
+def test_expired_refresh_token_rejected(client, tokens, db):
+    db.query(RefreshToken).update({"expires_at": datetime.utcnow() - timedelta(seconds=1)})
+    db.commit()
+    response = client.post("/api/refresh", data={"refresh_token": tokens["refresh_token"]})
+    assert response.status_code == 401
+    assert response.json()["detail"] == "Invalid or expired refresh token"
+
+def test_logout_revokes_refresh_token(client, tokens):
+    headers = {"Authorization": f"Bearer {tokens['access_token']}"}
+    response = client.post("/api/logout", headers=headers, data={"refresh_token": tokens["refresh_token"]})
+    assert response.status_code == 200
+    assert client.post("/api/refresh", data={"refresh_token": tokens["refresh_token"]}).status_code == 401
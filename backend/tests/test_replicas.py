@@ -0,0 +1,103 @@
+# backend/tests/test_replicas.py
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from itertools import cycle
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
+import database
+from main import app
+from database import Base, get_async_db, READ_PRIMARY_COOKIE
+from models import User, VIPTable
+from auth import hash_password
+from revocation import revocation_cache, token_versions
+
+# Two SQLite files stand in for the primary and a replica that hasn't replicated anything yet
+PRIMARY_DB = os.path.join(os.path.dirname(__file__), "test_replicas_primary.db")
+REPLICA_DB = os.path.join(os.path.dirname(__file__), "test_replicas_replica.db")
+engines = {path: create_engine(f"sqlite:///{path}") for path in (PRIMARY_DB, REPLICA_DB)}
+PrimarySessionLocal = async_sessionmaker(create_async_engine(f"sqlite+aiosqlite:///{PRIMARY_DB}", poolclass=NullPool), expire_on_commit=False)
+ReplicaSessionLocal = async_sessionmaker(create_async_engine(f"sqlite+aiosqlite:///{REPLICA_DB}", poolclass=NullPool), expire_on_commit=False)
+
+@pytest.fixture
+def client(monkeypatch):
+    for engine in engines.values():
+        Base.metadata.create_all(bind=engine)
+
+    async def override_get_async_db():
+        async with PrimarySessionLocal() as session:
+            yield session
+
+    app.dependency_overrides[get_async_db] = override_get_async_db
+    monkeypatch.setattr(database, "_next_replica", cycle([ReplicaSessionLocal]))
+    revocation_cache.reset()
+    token_versions.reset()
+    yield TestClient(app)
+    app.dependency_overrides.clear()
+    for engine in engines.values():
+        Base.metadata.drop_all(bind=engine)
+
+def signup(client, username="member"):
+    payload = {"user": {"username": username, "password": "test123"}, "vip": {"code": "VIP0000000042", "Nome": "Primary"}}
+    response = client.post("/signup/", json=payload)
+    assert response.status_code == 200
+    return response
+
+def login(client, username="member"):
+    response = client.post("/api/login", data={"username": username, "password": "test123"})
+    assert response.status_code == 200
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+def test_signup_sets_read_your_writes_cookie(client):
+    response = signup(client)
+    assert READ_PRIMARY_COOKIE in response.cookies
+
+def test_lagging_replica_falls_back_to_primary(client):
+    signup(client)
+    client.cookies.clear()
+    headers = login(client)
+    response = client.get("/api/dashboard?fields=Nome", headers=headers)
+    assert response.status_code == 200
+    assert response.json()["vip"]["Nome"] == "Primary"
+
+def test_reads_go_to_replica(client):
+    user_id = signup(client).json()["userid"]
+    # Replicate the member with a marker value so we can tell which node answered
+    with sessionmaker(bind=engines[REPLICA_DB])() as replica:
+        replica.add(User(id=user_id, username="member", password=hash_password("test123")))
+        replica.add(VIPTable(IDvip=user_id, code="VIP0000000042", Nome="Replica"))
+        replica.commit()
+
+    headers = login(client)
+    # Still inside the read-your-writes window: primary answers
+    assert client.get("/api/dashboard?fields=Nome", headers=headers).json()["vip"]["Nome"] == "Primary"
+    client.cookies.clear()
+    assert client.get("/api/dashboard?fields=Nome", headers=headers).json()["vip"]["Nome"] == "Replica"
+
+def test_writes_stay_on_primary(client):
+    signup(client)
+    client.cookies.clear()
+    with sessionmaker(bind=engines[REPLICA_DB])() as replica:
+        assert replica.query(User).count() == 0
+
+def test_logout_all_is_checked_against_primary(client):
+    user_id = signup(client).json()["userid"]
+    # The replica still has the member at token_version 0 after the logout below
+    with sessionmaker(bind=engines[REPLICA_DB])() as replica:
+        replica.add(User(id=user_id, username="member", password=hash_password("test123")))
+        replica.add(VIPTable(IDvip=user_id, code="VIP0000000042"))
+        replica.commit()
+    headers = login(client)
+
+    response = client.post("/api/logout/all", headers=headers)
+    assert response.status_code == 200
+    assert READ_PRIMARY_COOKIE in response.cookies
+    # Another device, without the read-your-writes cookie, reads from the lagging replica
+    client.cookies.clear()
+    response = client.get("/api/dashboard", headers=headers)
+    assert response.status_code == 401
@@ -0,0 +1,87 @@
+# backend/tests/test_revocation.py
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession
+from models import BlacklistedToken
+from jose import jwt
+from revocation import BloomFilter, revocation_cache, token_digest, revocation_digest, expiry_of, purge_expired_tokens
+from datetime import datetime, timedelta
+
+@pytest.fixture
+def token(client):
+    payload = {"user": {"username": "revoker", "password": "test123"}, "vip": {"code": "VIP0000000007"}}
+    assert client.post("/signup/", json=payload).status_code == 200
+    response = client.post("/api/login", data={"username": "revoker", "password": "test123"})
+    return response.json()["access_token"]
+
+def test_logout_revokes_without_refresh(client, token):
+    headers = {"Authorization": f"Bearer {token}"}
+    assert client.get("/api/dashboard", headers=headers).status_code == 200
+    assert client.post("/api/logout", headers=headers).status_code == 200
+    revocation_cache.refresh_seconds = float("inf")
+    response = client.get("/api/dashboard", headers=headers)
+    assert response.status_code == 401
+    assert "blacklisted" in response.json()["detail"].lower()
+
+def test_revocation_from_other_worker_seen_after_refresh(client, token, db):
+    headers = {"Authorization": f"Bearer {token}"}
+    assert client.get("/api/dashboard", headers=headers).status_code == 200
+
+    # Another worker blacklists the token directly in the shared table
+    payload = jwt.get_unverified_claims(token)
+    db.add(BlacklistedToken(digest=revocation_digest(token, payload), expires_at=expiry_of(payload)))
+    db.commit()
+    revocation_cache.refresh_seconds = float("inf")
+    assert client.get("/api/dashboard", headers=headers).status_code == 200
+
+    # Once the staleness window has passed the new row is picked up
+    revocation_cache.refresh_seconds = 0
+    assert client.get("/api/dashboard", headers=headers).status_code == 401
+
+@pytest.mark.asyncio
+async def test_refresh_sees_rows_committed_out_of_id_order(db, async_engine):
+    # Two workers insert; the one holding the lower id commits after the higher one was loaded
+    now = datetime.utcnow()
+    db.add(BlacklistedToken(id=2, digest=token_digest("first-commit"), expires_at=now + timedelta(minutes=30)))
+    db.commit()
+    revocation_cache.reset()
+    async with AsyncSession(async_engine) as session:
+        await revocation_cache.refresh(session)
+    assert revocation_cache.is_revoked(token_digest("first-commit"))
+
+    db.add(BlacklistedToken(id=1, digest=token_digest("late-commit"), expires_at=now + timedelta(minutes=30)))
+    db.commit()
+    async with AsyncSession(async_engine) as session:
+        await revocation_cache.refresh(session)
+    assert revocation_cache.is_revoked(token_digest("late-commit"))
+
+def test_bloom_filter_membership():
+    bloom = BloomFilter(bits=1 << 12)
+    digests = [token_digest(f"token-{i}") for i in range(50)]
+    for digest in digests:
+        bloom.add(digest)
+    assert all(digest in bloom for digest in digests)
+    misses = sum(token_digest(f"other-{i}") in bloom for i in range(1000))
+    assert misses < 50
+
+def test_tokens_carry_unique_jti(client, token):
+    response = client.post("/api/login", data={"username": "revoker", "password": "test123"})
+    other = response.json()["access_token"]
+    assert jwt.get_unverified_claims(token)["jti"] != jwt.get_unverified_claims(other)["jti"]
+
+@pytest.mark.asyncio
+async def test_purge_drops_expired_rows(db, async_engine):
+    now = datetime.utcnow()
+    db.add(BlacklistedToken(digest=token_digest("old"), expires_at=now - timedelta(minutes=1)))
+    db.add(BlacklistedToken(digest=token_digest("live"), expires_at=now + timedelta(minutes=30)))
+    db.commit()
+    revocation_cache.reset()
+    async with AsyncSession(async_engine) as session:
+        await revocation_cache.refresh(session)
+        assert await purge_expired_tokens(session) == 1
+    assert [row.digest for row in db.query(BlacklistedToken)] == [token_digest("live")]
+    assert not revocation_cache.is_revoked(token_digest("old"))
+    assert revocation_cache.is_revoked(token_digest("live"))
@@ -0,0 +1,38 @@
+# backend/tests/test_serve.py
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import serve
+
+
+def test_main_starts_uvicorn_with_settings(monkeypatch):
+    started = []
+    monkeypatch.delenv("HASH_POOL_WORKERS", raising=False)
+    monkeypatch.setattr(serve, "create_schema", lambda: None)
+    monkeypatch.setattr(serve, "run_uvicorn", started.append)
+    monkeypatch.setattr(os, "cpu_count", lambda: 8)
+    serve.main(["--server", "uvicorn", "--workers", "4", "--keepalive", "65", "--loop", "asyncio", "--http", "h11"])
+    (args,) = started
+    assert (args.workers, args.keepalive, args.loop, args.http) == (4, 65, "asyncio", "h11")
+    # 8 cores between 4 workers: two bcrypt threads each
+    assert os.environ["HASH_POOL_WORKERS"] == "2"
+
+def test_default_is_one_worker_per_core(monkeypatch):
+    started = []
+    monkeypatch.setenv("HASH_POOL_WORKERS", "3")
+    monkeypatch.setattr(serve, "create_schema", lambda: None)
+    monkeypatch.setattr(serve, "run_uvicorn", started.append)
+    monkeypatch.setattr(serve, "installed", lambda module: False)
+    monkeypatch.setattr(os, "cpu_count", lambda: 6)
+    serve.main(["--workers", "0"])
+    (args,) = started
+    assert args.server == "uvicorn"  # gunicorn isn't installed
+    assert args.workers == 6
+    assert os.environ["HASH_POOL_WORKERS"] == "3"  # Explicit setting wins
+
+def test_missing_uvloop_and_httptools_fall_back(monkeypatch):
+    monkeypatch.setattr(serve, "installed", lambda module: False)
+    assert serve.pick("uvloop", "asyncio") == "asyncio"
+    assert serve.pick("httptools", "h11") == "h11"
+    assert serve.pick("auto", "asyncio") == "auto"
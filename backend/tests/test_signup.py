@@ -0,0 +1,26 @@
+# backend/tests/test_signup.py
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from models import User, VIPTable
+
+def member(username, **vip):
+    return {"user": {"username": username, "password": "test123"}, "vip": vip}
+
+def test_signup_single_transaction(client, db):
+    response = client.post("/signup/", json=member("gil", Nome="Gil"))
+    assert response.status_code == 200
+    # INSERT users + INSERT viptest, no username pre-check or refresh
+    assert response.headers["X-DB-Queries"] == "2"
+    response = client.post("/signup/", json=member("gil"))
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Username already taken"
+    assert db.query(User).count() == 1
+    assert db.query(VIPTable).count() == 1
+
+def test_register_duplicate_from_constraint(client, db):
+    assert client.post("/api/register", data={"username": "hal", "password": "pw"}).status_code == 200
+    response = client.post("/api/register", data={"username": "hal", "password": "pw"})
+    assert response.status_code == 400
+    assert response.headers["X-DB-Queries"] == "1"
@@ -0,0 +1,90 @@
+# backend/tests/test_signup_batch.py
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import json
+from sqlalchemy import event
+from sqlalchemy.exc import DataError
+import main
+from models import User, VIPTable
+from auth import hash_password
+
+def member(username, **vip):
+    return {"user": {"username": username, "password": "test123"}, "vip": vip}
+
+def test_batch_json_with_partial_failures(client, db):
+    db.add(User(username="taken", password=hash_password("x")))
+    db.commit()
+    batch = [member("ada", Punti=5), member("taken"), member("ada"), {"user": {"username": ""}}, member("bea")]
+    response = client.post("/signup/batch", json=batch)
+    assert response.status_code == 200
+    body = response.json()
+    assert body["created"] == 2
+    assert body["failed"] == 3
+    statuses = [r["status"] for r in body["results"]]
+    assert statuses == ["created", "error", "error", "error", "created"]
+    assert body["results"][1]["detail"] == "Username already taken"
+    ada = db.query(User).filter(User.username == "ada").one()
+    assert body["results"][0]["userid"] == ada.id
+    assert db.query(VIPTable).filter(VIPTable.IDvip == ada.id).one().Punti == 5
+
+def test_batch_ndjson(client, db):
+    lines = [json.dumps(member("cai")), "not json", json.dumps(member("dan"))]
+    response = client.post("/signup/batch", content="\n".join(lines), headers={"Content-Type": "application/x-ndjson"})
+    body = response.json()
+    assert body["created"] == 2
+    assert body["results"][1]["status"] == "error"
+    assert db.query(VIPTable).count() == 2
+
+def test_batch_race_isolated(client, db, monkeypatch):
+    original = main.hash_password_async
+
+    async def racing_hash(password):
+        # A concurrent /signup/ grabs "eve" after the IN check
+        if not db.query(User).filter(User.username == "eve").first():
+            db.add(User(username="eve", password="x"))
+            db.commit()
+        return await original(password)
+
+    monkeypatch.setattr(main, "hash_password_async", racing_hash)
+    body = client.post("/signup/batch", json=[member("eve"), member("fay")]).json()
+    assert [r["status"] for r in body["results"]] == ["error", "created"]
+    assert db.query(VIPTable).count() == 1
+
+def test_batch_database_error_isolated(client, db, async_engine):
+    # A value the database refuses (MySQL strict mode) fails its own row, not the batch
+    def refuse_ivy(conn, cursor, statement, parameters, context, executemany):
+        if any(row.get("username") == "ivy" for row in getattr(context, "compiled_parameters", [])):
+            raise DataError(statement, parameters, Exception("Data too long"))
+
+    event.listen(async_engine.sync_engine, "before_cursor_execute", refuse_ivy)
+    try:
+        body = client.post("/signup/batch", json=[member("ivy"), member("jon")]).json()
+    finally:
+        event.remove(async_engine.sync_engine, "before_cursor_execute", refuse_ivy)
+    assert [r["status"] for r in body["results"]] == ["error", "created"]
+    assert body["results"][0]["detail"] == "Rejected by database: DataError"
+    assert db.query(User).count() == 1
+
+def test_batch_username_too_long(client):
+    body = client.post("/signup/batch", json=[member("x" * 51)]).json()
+    assert body["results"][0]["status"] == "error"
+    assert "user.username" in body["results"][0]["detail"]
+
+def test_batch_rejects_non_array(client):
+    assert client.post("/signup/batch", json={"user": {}}).status_code == 400
+
+def test_batch_body_size_capped(client, db, monkeypatch):
+    monkeypatch.setattr(main, "SIGNUP_BATCH_MAX_BYTES", 1000)
+    batch = [member(f"big{i}") for i in range(50)]
+    # Known Content-Length: refused before the body is read
+    assert client.post("/signup/batch", json=batch).status_code == 413
+
+    # Chunked NDJSON: refused once the streamed bytes pass the cap
+    def chunks():
+        for item in batch:
+            yield (json.dumps(item) + "\n").encode()
+    response = client.post("/signup/batch", content=chunks(), headers={"Content-Type": "application/x-ndjson"})
+    assert response.status_code == 413
+    assert db.query(User).count() == 0
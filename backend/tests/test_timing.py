@@ -0,0 +1,71 @@
+# backend/tests/test_timing.py
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import logging
+import pytest
+from sqlalchemy import text
+import timing
+from main import app
+from timing import RequestTimings, request_timings, report_repeated_queries, timed
+
+@pytest.fixture
+def timings():
+    timings = RequestTimings()
+    token = request_timings.set(timings)
+    yield timings
+    request_timings.reset(token)
+
+def test_engine_events_time_queries(engine, timings):
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+        conn.execute(text("SELECT 1"))
+    assert timings.queries == 2
+    assert timings.db_seconds > 0
+    assert timings.statements["SELECT 1"] == 2
+
+def test_slow_queries_are_logged_without_values(engine, monkeypatch, caplog, timings):
+    monkeypatch.setattr(timing, "SLOW_QUERY_SECONDS", 0.0)
+    with caplog.at_level(logging.WARNING, logger="timing"), engine.connect() as conn:
+        conn.execute(text("SELECT :secret"), {"secret": "hunter2"})
+    assert "Slow query" in caplog.text
+    assert "1 params" in caplog.text
+    assert "hunter2" not in caplog.text
+
+def test_repeated_queries_are_reported(engine, caplog, timings):
+    with engine.connect() as conn:
+        for i in range(timing.N_PLUS_ONE_THRESHOLD):
+            conn.execute(text("SELECT :i"), {"i": i})
+    with caplog.at_level(logging.WARNING, logger="timing"):
+        report_repeated_queries(timings, "/api/test")
+    assert f"Possible N+1 in /api/test: identical query ran {timing.N_PLUS_ONE_THRESHOLD} times" in caplog.text
+
+def test_phases_accumulate(timings):
+    with timed("auth"):
+        pass
+    with timed("auth"):
+        pass
+    assert list(timings.phases) == ["auth"]
+    assert timings.server_timing().startswith('db;dur=0.0;desc="0 queries", auth;dur=')
+
+def test_server_timing_header(client):
+    payload = {"user": {"username": "member", "password": "test123"}, "vip": {"code": "VIP0000000017"}}
+    response = client.post("/signup/", json=payload)
+    assert 'db;dur=' in response.headers["Server-Timing"]
+    assert "auth;dur=" in response.headers["Server-Timing"]
+
+    token = client.post("/api/login", data={"username": "member", "password": "test123"}).json()["access_token"]
+    response = client.get("/api/dashboard", headers={"Authorization": f"Bearer {token}"})
+    server_timing = response.headers["Server-Timing"]
+    assert "auth;dur=" in server_timing
+    assert "serialize;dur=" in server_timing
+    assert f'desc="{response.headers["X-DB-Queries"]} queries"' in server_timing
+
+    response = client.get("/api/barcode?format=svg", headers={"Authorization": f"Bearer {token}"})
+    assert "render;dur=" in response.headers["Server-Timing"]
+
+def test_no_base_http_middleware():
+    # Every middleware is plain ASGI: no extra task or response re-streaming per request
+    from starlette.middleware.base import BaseHTTPMiddleware
+    assert not [m for m in app.user_middleware if m.cls is BaseHTTPMiddleware]
@@ -0,0 +1,84 @@
+# backend/tests/test_vip_image.py
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import struct
+import zlib
+from io import BytesIO
+import pytest
+from PIL import Image
+from models import VIPImage, VIPTable
+from images import image_etag, make_thumbnails
+
+@pytest.fixture
+def headers(client):
+    payload = {"user": {"username": "photo", "password": "test123"}, "vip": {"code": "VIP0000000011"}}
+    assert client.post("/signup/", json=payload).status_code == 200
+    token = client.post("/api/login", data={"username": "photo", "password": "test123"}).json()["access_token"]
+    return {"Authorization": f"Bearer {token}"}
+
+def png_bytes(width=600, height=400) -> bytes:
+    buffer = BytesIO()
+    Image.new("RGB", (width, height), (200, 30, 30)).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+def png_header(width, height) -> bytes:
+    # Just a signature and IHDR: the canvas size is declared, no pixel data follows
+    ihdr = b"IHDR" + struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)
+    return b"\x89PNG\r\n\x1a\n" + struct.pack(">I", 13) + ihdr + struct.pack(">I", zlib.crc32(ihdr))
+
+def test_no_image(client, headers):
+    assert client.get("/api/vip/image", headers=headers).status_code == 404
+
+def test_upload_and_fetch_variants(client, headers, db):
+    original = png_bytes()
+    response = client.put("/api/vip/image", headers=headers, files={"file": ("me.png", original, "image/png")})
+    assert response.status_code == 200
+    assert sorted(row.size for row in db.query(VIPImage)) == [64, 256]
+
+    response = client.get("/api/vip/image", headers=headers)
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "image/png"
+    assert response.content == original
+    assert "max-age" in response.headers["cache-control"]
+
+    response = client.get("/api/vip/image?size=64", headers=headers)
+    assert response.headers["content-type"] == "image/jpeg"
+    assert max(Image.open(BytesIO(response.content)).size) == 64
+    assert len(response.content) < len(original)
+
+def test_image_not_modified(client, headers):
+    client.put("/api/vip/image", headers=headers, files={"file": ("me.png", png_bytes(), "image/png")})
+    etag = client.get("/api/vip/image?size=256", headers=headers).headers["etag"]
+    response = client.get("/api/vip/image?size=256", headers={**headers, "If-None-Match": etag})
+    assert response.status_code == 304
+
+def test_original_not_modified_skips_blob(client, headers, db):
+    original = png_bytes()
+    client.put("/api/vip/image", headers=headers, files={"file": ("me.png", original, "image/png")})
+    assert db.query(VIPTable).one().img_etag == image_etag(original)
+
+    client.get("/api/vip/image", headers=headers)
+    full = client.get("/api/vip/image", headers=headers)
+    assert full.headers["etag"] == image_etag(original)
+    response = client.get("/api/vip/image", headers={**headers, "If-None-Match": full.headers["etag"]})
+    assert response.status_code == 304
+    # Same member query, no SELECT of the image column
+    assert int(response.headers["X-DB-Queries"]) == int(full.headers["X-DB-Queries"]) - 1
+
+def test_upload_rejects_non_image(client, headers):
+    response = client.put("/api/vip/image", headers=headers, files={"file": ("x.png", b"not an image", "image/png")})
+    assert response.status_code == 400
+
+def test_unknown_size(client, headers):
+    assert client.get("/api/vip/image?size=100", headers=headers).status_code == 400
+
+@pytest.mark.parametrize("width, height", [(20000, 20000), (5000, 5000)])
+def test_upload_rejects_oversized_canvas(client, headers, width, height):
+    # 20000x20000 trips Pillow's own bomb check, 5000x5000 only IMAGE_MAX_PIXELS
+    data = png_header(width, height)
+    with pytest.raises(ValueError):
+        make_thumbnails(data)
+    response = client.put("/api/vip/image", headers=headers, files={"file": ("big.png", data, "image/png")})
+    assert response.status_code == 400
@@ -0,0 +1,106 @@
+# timing.py
+# Per-request timing: SQL statements and named phases (auth, render, serialize),
+# reported as Server-Timing headers by TimingMiddleware.
+import logging
+import os
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+logger = logging.getLogger(__name__)
+
+# Statements slower than this are logged with their duration and parameter shape
+SLOW_QUERY_SECONDS = float(os.getenv("SLOW_QUERY_SECONDS", "0.1"))
+# The same SQL text run this many times in one request is reported as a likely N+1
+N_PLUS_ONE_THRESHOLD = int(os.getenv("N_PLUS_ONE_THRESHOLD", "3"))
+
+
+class RequestTimings:
+    """SQL count and time plus named phase durations for one request."""
+
+    def __init__(self):
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.phases = {}  # name -> seconds
+        self.statements = Counter()
+
+    def add_query(self, statement: str, seconds: float):
+        self.queries += 1
+        self.db_seconds += seconds
+        self.statements[statement] += 1
+
+    def add_phase(self, name: str, seconds: float):
+        self.phases[name] = self.phases.get(name, 0.0) + seconds
+
+    def repeated_statements(self, threshold: int = N_PLUS_ONE_THRESHOLD) -> list:
+        return [(statement, count) for statement, count in self.statements.items() if count >= threshold]
+
+    def server_timing(self) -> str:
+        entries = [f'db;dur={self.db_seconds * 1000:.1f};desc="{self.queries} queries"']
+        entries += [f"{name};dur={seconds * 1000:.1f}" for name, seconds in self.phases.items()]
+        return ", ".join(entries)
+
+
+# Set by the middleware for each request; None outside requests (scripts, startup)
+request_timings = ContextVar("request_timings", default=None)
+
+@contextmanager
+def timed(phase: str):
+    # Times a block of request work under a Server-Timing name
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings = request_timings.get()
+        if timings is not None:
+            timings.add_phase(phase, time.perf_counter() - start)
+
+
+def parameters_shape(parameters, executemany: bool) -> str:
+    # Shape only: values may be password hashes or personal data
+    if executemany:
+        return f"{len(parameters)} rows x {len(parameters[0]) if parameters else 0} params"
+    return f"{len(parameters) if parameters else 0} params"
+
+def record_query(statement: str, parameters, executemany: bool, seconds: float):
+    timings = request_timings.get()
+    if timings is not None:
+        timings.add_query(statement, seconds)
+    if seconds >= SLOW_QUERY_SECONDS:
+        logger.warning("Slow query (%.1f ms, %s): %s", seconds * 1000, parameters_shape(parameters, executemany),
+                       " ".join(statement.split())[:500])
+
+def report_repeated_queries(timings: RequestTimings, route: str):
+    for statement, count in timings.repeated_statements():
+        logger.warning("Possible N+1 in %s: identical query ran %d times: %s", route, count, " ".join(statement.split())[:500])
+
+
+class TimingMiddleware:
+    """Plain ASGI middleware, like MetricsMiddleware: the headers go into http.response.start."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        # Expose SQL count and per-phase timings (db, auth, render, serialize) for each request
+        timings = RequestTimings()
+        token = request_timings.set(timings)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = list(message.get("headers", [])) + [
+                    (b"x-db-queries", str(timings.queries).encode()),
+                    (b"server-timing", timings.server_timing().encode()),
+                ]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            request_timings.reset(token)
+        route = scope.get("route")
+        report_repeated_queries(timings, route.path if route else scope["path"])
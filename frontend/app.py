@@ -6,8 +6,17 @@ import jwt  # Add this to decode the token manually for debugging
 
 BASE_URL = "http://127.0.0.1:8000/api"
 
+# VIP columns shown by display_dashboard; the image and POS fields are not fetched
+DASHBOARD_FIELDS = ",".join([
+    "code", "nascita", "cellulare", "sms", "Punti", "Sconto", "P_ldata", "P_importo", "Nome", "cognome",
+    "Indirizzo", "Cap", "Citta", "Prov", "CodiceFiscale", "Email", "sesso", "VIPanno", "VIPscadenza",
+    "Blocco", "omail", "utime",
+])
+
 if "token" not in st.session_state:
     st.session_state.token = None
+if "refresh_token" not in st.session_state:
+    st.session_state.refresh_token = None
 
 if "page" not in st.session_state:
     st.session_state.page = "Login"  # Default to Login
@@ -22,6 +31,7 @@ def login():
             response.raise_for_status()
             data = response.json()
             st.session_state.token = data["access_token"]
+            st.session_state.refresh_token = data.get("refresh_token")
             st.success("Logged in successfully!")
             # Decode token to show username (assuming JWT)
             try:
@@ -43,6 +53,19 @@ def register():
         except requests.exceptions.RequestException as e:
             st.error(f"Registration failed: {e.response.json()['detail'] if e.response else 'Unknown error'}")
 
+def refresh_session() -> bool:
+    # Swap the refresh token for a new pair instead of asking for the password again
+    if not st.session_state.refresh_token:
+        return False
+    response = requests.post(f"{BASE_URL}/refresh", data={"refresh_token": st.session_state.refresh_token})
+    if response.status_code != 200:
+        st.session_state.refresh_token = None
+        return False
+    data = response.json()
+    st.session_state.token = data["access_token"]
+    st.session_state.refresh_token = data["refresh_token"]
+    return True
+
 def dashboard():
     if st.session_state.token:
         try:
@@ -53,13 +76,16 @@ def dashboard():
 #             st.write(f"Welcome, {data['username']}!")
 #             st.write(data["message"])
             headers = {"Authorization": f"Bearer {st.session_state.token}"}
-            response = requests.get(f"{BASE_URL}/dashboard", headers=headers)
+            response = requests.get(f"{BASE_URL}/dashboard", headers=headers, params={"fields": DASHBOARD_FIELDS})
+            if response.status_code == 401 and refresh_session():
+                headers = {"Authorization": f"Bearer {st.session_state.token}"}
+                response = requests.get(f"{BASE_URL}/dashboard", headers=headers, params={"fields": DASHBOARD_FIELDS})
             if response.status_code == 200:
                 data = response.json()
                 st.write(f"Welcome, {data['username']}!")
                 vip_data = data["vip"]
                 # Convert hex string back to bytes for img if needed
-                if vip_data["img"]:
+                if vip_data.get("img"):
                     vip_data["img"] = bytes.fromhex(vip_data["img"])
                 vip = VIP(**vip_data)
                 display_dashboard(vip)
@@ -72,17 +98,23 @@ def dashboard():
                 except JWTError as e:
                     st.write(f"Debug: Could not decode token: {e}")
 
-            # Add logout button
-            if st.button("Logout"):
+            # Add logout buttons
+            logout_here = st.button("Logout")
+            logout_everywhere = st.button("Logout from all devices")
+            if logout_here or logout_everywhere:
                 try:
                     # Call the logout endpoint
                     headers = {"Authorization": f"Bearer {st.session_state.token}"}
-                    response = requests.post(f"{BASE_URL}/logout", headers=headers)
+                    if logout_everywhere:
+                        response = requests.post(f"{BASE_URL}/logout/all", headers=headers)
+                    else:
+                        response = requests.post(f"{BASE_URL}/logout", headers=headers, data={"refresh_token": st.session_state.refresh_token})
                     response.raise_for_status()
-                    st.success("You have been logged out from all devices!")
+                    st.success("You have been logged out from all devices!" if logout_everywhere else "You have been logged out.")
                 except requests.exceptions.RequestException as e:
                     st.error(f"Logout failed: {e.response.json()['detail'] if e.response else 'Unknown error'}")
                 st.session_state.token = None
+                st.session_state.refresh_token = None
                 st.rerun()  # Refresh the page
         except requests.exceptions.RequestException as e:
             st.error("Failed to load dashboard. Please log in again.")